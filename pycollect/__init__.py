@@ -1,3 +1,3 @@
 from .device import GEDevice
-from .decode import GEDecode
+from .decode import GEDecode, iter_records
 from .edfwriter import EDF, EDFChannel
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+=======
+Asyncio
+=======
+
+Asyncio transport for the serial port, the data is read by the event loop
+when the file descriptor is readable, without a thread for each device.
+
+.. code:: ipython3
+
+    async def main():
+        device = AsyncGEDevice()
+        device.connect('/dev/ttyUSB0')
+        device.request(subtype=device.DISPL, waveform_set=['PLETH'])
+        device.collect(True)
+
+        decoder = GEDecode(device.BUFFER, notifier=device.NOTIFIER)
+
+        async for record in decoder.stream():
+            print(record)
+
+    asyncio.run(main())
+
+
+Many monitors can be multiplexed in the same event loop, one `stream` task
+for each decoder.
+
+"""
+
+import os
+import time
+import asyncio
+
+from .dataconstants import CONST
+from .device import GEDevice
+
+
+########################################################################
+class AsyncDataNotifier:
+    """Asyncio version of `DataNotifier`, used by `GEDecode.stream`."""
+
+    #----------------------------------------------------------------------
+    def __init__(self):
+        """"""
+
+        self.event = asyncio.Event()
+        self.arrival = None  # Oldest notification not consumed yet
+
+
+    #----------------------------------------------------------------------
+    def notify(self):
+        """Wake the waiting consumers."""
+
+        if self.arrival is None:
+            self.arrival = time.monotonic()
+        self.event.set()
+
+
+    #----------------------------------------------------------------------
+    async def wait(self, timeout=None):
+        """Wait until a notification arrives.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait in seconds.
+
+        Returns
+        -------
+        bool
+            `False` if the timeout expired without notifications.
+        """
+
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+    #----------------------------------------------------------------------
+    def consume(self):
+        """Mark the pending notifications as attended.
+
+        Returns
+        -------
+        float
+            Arrival time (`time.monotonic`) of the oldest pending notification
+            or `None`.
+        """
+
+        arrival = self.arrival
+        self.arrival = None
+        self.event.clear()
+        return arrival
+
+
+
+########################################################################
+class AsyncGEDevice(GEDevice):
+    """Establish the connection and read the monitor data in an event loop.
+
+    The connection and requests are the same of `GEDevice`, only the reading
+    changes: the event loop calls the reader when the non-blocking file
+    descriptor of the port has data available.
+    """
+
+    #----------------------------------------------------------------------
+    def __init__(self, buffer='bytearray', capacity=2**20, policy='overwrite', spill=None, capture=None, loop=None):
+        """
+        Parameters
+        ----------
+        buffer : str, 'bytearray'
+            Input buffer type, see `GEDevice`.
+        capacity : int, 2**20
+            Bytes preallocated for the `ring` buffer.
+        policy : str, 'overwrite'
+            `ring` buffer policy when is full, `overwrite` or `spill`.
+        spill : str, file object, optional
+            Destination of the bytes discarded by the `spill` policy.
+        capture : str, SegmentedCapture, optional
+            Directory or `SegmentedCapture` for the received bytes.
+        loop : asyncio.AbstractEventLoop, optional
+            Event loop, by default the running one when `collect` is called.
+        """
+
+        super().__init__(buffer=buffer, capacity=capacity, policy=policy, spill=spill, capture=capture)
+
+        self.NOTIFIER = AsyncDataNotifier()
+        self.loop = loop
+        self.device = None
+
+
+    #----------------------------------------------------------------------
+    def collect(self, flag=True, size=2**12):
+        """Enable or disable the data reading in the event loop.
+
+        Without a `loop` it must be called from the running event loop.
+
+        Parameters
+        ----------
+        flag: bool, True
+           Enable or disable the data reading.
+        size: integer, 2**12
+           Maximum bytes read each time.
+        """
+
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+
+        if flag and not self.READING:
+            self.size = size
+            self.loop.add_reader(self.device.fileno(), self.__on_readable__)
+        elif not flag and self.READING:
+            self.loop.remove_reader(self.device.fileno())
+
+        self.READING = flag
+
+
+    #----------------------------------------------------------------------
+    def __on_readable__(self):
+        """Write into the data buffer the bytes available in the port."""
+
+        # The port is opened by pyserial with O_NONBLOCK
+        try:
+            data = os.read(self.device.fileno(), self.size)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+
+        if not data:
+            self.collect(False)
+            self.close()
+            self.on_connection_loss()
+            return
+
+        self.BUFFER.extend(data)
+
+        if self.CAPTURE:
+            self.CAPTURE.write(data)
+
+        # A FRAMECHAR could complete a frame
+        if CONST.FRAMECHAR in data:
+            self.NOTIFIER.notify()
+
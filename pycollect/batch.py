@@ -0,0 +1,465 @@
+"""
+=====
+Batch
+=====
+
+Decode and export many raw captures in parallel, one file for each worker
+process. A failure decoding or exporting a file is reported in its summary
+and does not stop the rest of the batch.
+
+.. code:: ipython3
+
+    summaries = decode_batch(database.RAWS_ABSPATH, 'output', formats=['csv', 'npz'])
+
+
+From the command line:
+
+.. code:: bash
+
+    $ python -m pycollect.batch captures/ --output output --format csv npz --jobs 4
+
+
+A single large capture can be decoded in parallel too, it is splitted at
+frame delimiters and the chunks are decoded by the workers:
+
+.. code:: ipython3
+
+    decoder = decode_parallel('overnight.raw', workers=8)
+
+"""
+
+import os
+import sys
+import mmap
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .dataconstants import CONST
+from .decode import GEDecode, WaveBlock
+from .deframe import Deframer
+from .storage import WaveformStore
+
+FORMATS = ['csv', 'edf', 'npz']
+
+# Bytes of the `IMAGE` updated by the display records, one class each 270 bytes
+CLASSES = slice(4, 4 + 270 * 4)
+
+
+#----------------------------------------------------------------------
+def decode_file(filename, output, formats=('csv', ), **kwargs):
+    """Decode and export a single raw capture.
+
+    Parameters
+    ----------
+    filename : str
+        Raw file.
+    output : str
+        Directory for the exported files.
+    formats : list, ('csv', )
+        Export formats, `csv`, `edf` or `npz`.
+    kwargs : dict
+        Arguments for `GEDecode.from_file`.
+
+    Returns
+    -------
+    dict
+        Summary with the `status` (`ok` or `error`), the number of records,
+        samples for each waveform, the exported files and the elapsed time.
+    """
+
+    start = time.time()
+    summary = {'filename': filename, 'status': 'ok', 'outputs': [], }
+
+    try:
+        decoder = GEDecode.from_file(filename, **kwargs)
+
+        summary['subrecords'] = len(decoder.STORE_SUBRECORD)
+        summary['waveforms'] = {name: decoder.STORE_WAVE.length(name) for name in decoder.STORE_WAVE}
+
+        name = os.path.join(output, os.path.splitext(os.path.basename(filename))[0])
+        for format_ in formats:
+            summary['outputs'].extend(getattr(decoder, 'save_as_{}'.format(format_))(name))
+
+    except Exception as e:
+        summary['status'] = 'error'
+        summary['error'] = repr(e)
+        summary['traceback'] = traceback.format_exc()
+
+    summary['seconds'] = time.time() - start
+    return summary
+
+
+#----------------------------------------------------------------------
+def decode_batch(filenames, output, formats=('csv', ), workers=None, progress=None, **kwargs):
+    """Decode and export a list of raw captures in a pool of processes.
+
+    Parameters
+    ----------
+    filenames : list
+        Raw files.
+    output : str
+        Directory for the exported files.
+    formats : list, ('csv', )
+        Export formats, `csv`, `edf` or `npz`.
+    workers : int, optional
+        Number of processes, by default the number of CPUs.
+    progress : callable, optional
+        Called with the number of files completed, the total and the summary
+        of the last one.
+    kwargs : dict
+        Arguments for `GEDecode.from_file`.
+
+    Returns
+    -------
+    list
+        Summaries, in the same order of `filenames`.
+    """
+
+    for format_ in formats:
+        if not format_ in FORMATS:
+            raise Exception('Format {} is not available'.format(format_))
+
+    os.makedirs(output, exist_ok=True)
+
+    summaries = [None] * len(filenames)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        futures = {executor.submit(decode_file, filename, output, formats, **kwargs): i for i, filename in enumerate(filenames)}
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+
+            # A crashed worker only affects its own file
+            try:
+                summaries[i] = future.result()
+            except Exception as e:
+                summaries[i] = {'filename': filenames[i], 'status': 'error', 'error': repr(e), 'outputs': [], }
+
+            if progress:
+                progress(done, len(filenames), summaries[i])
+
+    return summaries
+
+
+#----------------------------------------------------------------------
+def split_capture(filename, chunks, window=2**24, warmup=2**16):
+    """Split a raw capture in chunks aligned to FRAMECHAR delimiters.
+
+    The deframer state (storing and escaping flags) at each split point is
+    computed with `Deframer.skip`, so each chunk can be decoded alone with
+    the same result of the sequential decoding.
+
+    Parameters
+    ----------
+    filename : str
+        Raw file.
+    chunks : int
+        Desired number of chunks.
+    window : int, 2**24
+        Bytes scanned each time.
+    warmup : int, 2**16
+        Bytes before each split point decoded again to seed the last
+        physiological record, see `seed_image`.
+
+    Returns
+    -------
+    list
+        Tuples with `start`, `stop`, `storing`, `bitshift` and `seed` for
+        each chunk, the seed is a tuple with the `offset`, `storing` and
+        `bitshift` of the warm-up, `None` for the first chunk.
+    """
+
+    size = os.path.getsize(filename)
+    if not size:
+        return []
+
+    step = max(size // chunks, 1)
+    points = [(0, False, False, None)]
+    deframer = Deframer()
+    offset = 0
+
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+
+        #----------------------------------------------------------------------
+        def advance(position):
+            nonlocal offset
+            while offset < position:
+                stop = min(offset + window, position)
+                deframer.skip(buffer[offset:stop])
+                offset = stop
+
+        for target in range(step, size, step):
+
+            # Split just after a delimiter, the partial frame is empty there
+            split = buffer.find(bytes([CONST.FRAMECHAR]), max(target, offset)) + 1
+            if not split:
+                break
+
+            # The warm-up starts after a delimiter too, inside this chunk
+            seed = buffer.find(bytes([CONST.FRAMECHAR]), max(split - warmup, offset), split) + 1
+            advance(max(seed, offset))
+            seed = (offset, deframer.storing, deframer.bitshift)
+
+            advance(split)
+
+            if split > points[-1][0] and split < size:
+                points.append((split, deframer.storing, deframer.bitshift, seed))
+
+    stops = [point[0] for point in points[1:]] + [size]
+    return [(start, stop, storing, bitshift, seed) for (start, storing, bitshift, seed), stop in zip(points, stops)]
+
+
+#----------------------------------------------------------------------
+def seed_image(filename, start, seed, window=2**20, **kwargs):
+    """Last physiological record before a split point.
+
+    Each display record only updates the classes that it contains, so the
+    record decoded sequentially depends on the previous ones. The warm-up
+    from the `seed` is decoded twice, starting with two different images,
+    when the results are different the warm-up is not enough and it starts
+    at the beginning of the capture.
+
+    Parameters
+    ----------
+    filename : str
+        Raw file.
+    start : int
+        Split point.
+    seed : tuple
+        `offset`, `storing` and `bitshift` of the warm-up.
+    window : int, 2**20
+        Bytes decoded each time.
+    kwargs : dict
+        Arguments for `GEDecode`.
+
+    Returns
+    -------
+    bytearray
+        `IMAGE` of the sequential decoder at `start`.
+    """
+
+    offset, storing, bitshift = seed
+
+    #----------------------------------------------------------------------
+    def warmup(buffer, offset, storing, bitshift, fill):
+        decoder = GEDecode([], store=False, **kwargs)
+        decoder.deframer = Deframer(storing, bitshift)
+        decoder.IMAGE[CLASSES] = bytes([fill]) * len(decoder.IMAGE[CLASSES])
+
+        decoder.BUFFER = buffer
+        decoder.OFFSET = offset
+        while decoder.OFFSET < start:
+            decoder.__processing__(stop=min(decoder.OFFSET + window, start))
+
+        decoder.clear_buffer()
+        return decoder.IMAGE
+
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+
+        image = warmup(buffer, offset, storing, bitshift, 0)
+        if offset and image[CLASSES] != warmup(buffer, offset, storing, bitshift, 0xff)[CLASSES]:
+            image = warmup(buffer, 0, False, False, 0)
+
+    return image
+
+
+#----------------------------------------------------------------------
+def decode_chunk(filename, start, stop, storing=False, bitshift=False, window=2**20, seed=None, **kwargs):
+    """Decode a chunk of a raw capture into columns.
+
+    Parameters
+    ----------
+    filename : str
+        Raw file.
+    start : int
+        First byte, just after a FRAMECHAR.
+    stop : int
+        Last byte, not included.
+    storing : bool, False
+        Deframer state at `start`.
+    bitshift : bool, False
+        Deframer state at `start`.
+    window : int, 2**20
+        Bytes decoded each time.
+    seed : tuple, optional
+        Warm-up of `split_capture` for the last physiological record, see
+        `seed_image`.
+    kwargs : dict
+        Arguments for `GEDecode`.
+
+    Returns
+    -------
+    dict
+        Samples and blocks of each waveform (`waveforms`), the dates and the
+        columns of the subrecords like `SubrecordStore.extend` (`dates` and
+        `columns`) and each status of the modules with its datetime
+        (`modules`), the first one is always included.
+    """
+
+    waveforms = WaveformStore()
+    dates = []
+    columns = {}
+    modules = []
+
+    #----------------------------------------------------------------------
+    def collect(record):
+        if isinstance(record, WaveBlock):
+            waveforms.append(record.name, record.time, record.samples, record.shift)
+            return
+
+        for label, value in record.values.items():
+            if not label in columns:
+                columns[label] = ([], [])
+            columns[label][0].append(len(dates))
+            columns[label][1].append(value)
+        dates.append(record.datetime)
+
+    decoder = GEDecode([], store=False, **kwargs)
+    decoder.deframer = Deframer(storing, bitshift)
+    decoder.add_listener(collect)
+
+    if seed is not None:
+        decoder.IMAGE = seed_image(filename, start, seed, window, **kwargs)
+
+    decoder.MODULES = None
+    decoder.on_module_change = lambda date_: modules.append((date_, decoder.MODULES, decoder.MODULES_ACTIVE, decoder.MEANSURES_AVAILABLE))
+
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+
+        decoder.BUFFER = buffer
+        decoder.OFFSET = start
+
+        while decoder.OFFSET < stop:
+            decoder.__processing__(stop=min(decoder.OFFSET + window, stop))
+
+        decoder.clear_buffer()
+
+    for label, (rows, values) in columns.items():
+        present = np.zeros(len(dates), dtype=bool)
+        present[rows] = True
+        columns[label] = (values, present)
+
+    return {
+        'waveforms': {name: (waveforms.samples[name].array(), waveforms.blocks[name].array()) for name in waveforms},
+        'dates': np.array(dates, dtype='datetime64[ns]'),
+        'columns': columns,
+        'modules': modules,
+    }
+
+
+#----------------------------------------------------------------------
+def decode_parallel(filename, workers=None, chunks=None, window=2**20, decoder_class=GEDecode, min_chunk=2**22, **kwargs):
+    """Decode a single raw capture using a pool of processes.
+
+    The capture is splitted with `split_capture`, each chunk is decoded in a
+    worker into columns and they are concatenated in the file order, the
+    result is the same of the sequential `GEDecode.from_file`. The
+    `on_module_change` calls are done after the merge, in the same order
+    and with the same datetimes of the sequential decoding.
+
+    With a single worker or chunks smaller than `min_chunk` the capture is
+    decoded sequentially, the processes only add overhead.
+
+    Parameters
+    ----------
+    filename : str
+        Raw file.
+    workers : int, optional
+        Number of processes, by default the number of CPUs.
+    chunks : int, optional
+        Number of chunks, by default four for each worker.
+    window : int, 2**20
+        Bytes decoded each time by the workers.
+    decoder_class : class, GEDecode
+        Class of the returned decoder, a subclass can overwrite
+        `on_module_change`.
+    min_chunk : int, 2**22
+        Minimum bytes for each chunk.
+    kwargs : dict
+        Arguments for `GEDecode`, only the `numpy` engine is supported.
+
+    Returns
+    -------
+    GEDecode
+        Decoder with the data, without buffer.
+    """
+
+    if kwargs.get('engine', 'numpy') != 'numpy':
+        raise Exception('Only the numpy engine can decode in parallel')
+
+    workers = workers or os.cpu_count() or 1
+
+    if chunks is None:
+        chunks = 4 * workers
+
+    chunks = min(chunks, os.path.getsize(filename) // max(min_chunk, 1))
+
+    if workers < 2 or chunks < 2:
+        return decoder_class.from_file(filename, window, **kwargs)
+
+    decoder = decoder_class([], **kwargs)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        futures = [executor.submit(decode_chunk, filename, start, stop, storing, bitshift, window, seed, **kwargs)
+                   for start, stop, storing, bitshift, seed in split_capture(filename, chunks)]
+
+        results = [future.result() for future in futures]
+
+    # The samples of each waveform are concatenated once
+    names = []
+    for result in results:
+        names.extend(name for name in result['waveforms'] if not name in names)
+
+    for name in names:
+        waves = [result['waveforms'][name] for result in results if name in result['waveforms']]
+        decoder.STORE_WAVE.extend(name, np.concatenate([samples for samples, _ in waves]), np.concatenate([blocks for _, blocks in waves]))
+
+    for result in results:
+        decoder.STORE_SUBRECORD.extend(result['dates'], result['columns'])
+
+    # Only the real changes, the first status of each chunk is compared with the previous one
+    for result in results:
+        for date_, *status in result['modules']:
+            if status != [decoder.MODULES, decoder.MODULES_ACTIVE, decoder.MEANSURES_AVAILABLE]:
+                decoder.MODULES, decoder.MODULES_ACTIVE, decoder.MEANSURES_AVAILABLE = status
+                decoder.on_module_change(date_)
+
+    return decoder
+
+
+#----------------------------------------------------------------------
+def main(argv=None):
+    """Command line interface for `decode_batch`."""
+
+    parser = argparse.ArgumentParser(prog='pycollect-batch', description='Decode and export raw captures in parallel.')
+    parser.add_argument('inputs', nargs='+', help='raw files or directories with raw files')
+    parser.add_argument('-o', '--output', default='.', help='directory for the exported files')
+    parser.add_argument('-f', '--format', nargs='+', default=['csv'], choices=FORMATS, help='export formats')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of processes')
+    args = parser.parse_args(argv)
+
+    filenames = []
+    for input_ in args.inputs:
+        if os.path.isdir(input_):
+            filenames.extend(sorted(os.path.join(input_, f) for f in os.listdir(input_) if f.endswith('.raw')))
+        else:
+            filenames.append(input_)
+
+    def progress(done, total, summary):
+        print('[{}/{}] {} {} {:.1f}s'.format(done, total, summary['filename'], summary['status'], summary.get('seconds', 0)))
+        if summary['status'] == 'error':
+            print('    {}'.format(summary['error']))
+
+    summaries = decode_batch(filenames, args.output, args.format, args.jobs, progress)
+
+    return int(any(summary['status'] == 'error' for summary in summaries))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+======
+Buffer
+======
+
+Compact byte buffers for the raw data received from the monitor.
+
+The `RingBuffer` preallocates a fixed capacity and is addressed with absolute
+offsets, so a decoder can keep consuming it while the oldest bytes are
+discarded. When the capacity is exhausted the oldest bytes are overwritten or
+spilled to a file.
+
+.. code:: ipython3
+
+    buffer = RingBuffer(2**20, policy='spill', spill='session.raw')
+    buffer.extend(data)
+
+    buffer[offset:len(buffer)]  # copy of the new bytes
+
+The `DataNotifier` wakes the decoder when new data arrives:
+
+.. code:: ipython3
+
+    notifier = DataNotifier()
+    notifier.notify()  # reader side
+    notifier.wait(timeout=1)  # decoder side
+
+"""
+
+import time
+from threading import Lock, Condition
+
+
+########################################################################
+class RingBuffer:
+    """Fixed capacity circular buffer of bytes.
+
+    The indexes are absolute (bytes written since the creation), `len` returns
+    the total number of bytes written and slices can be requested from
+    `start`, the oldest byte still available.
+    """
+
+    POLICIES = ['overwrite', 'spill']
+
+    #----------------------------------------------------------------------
+    def __init__(self, capacity=2**20, policy='overwrite', spill=None):
+        """
+        Parameters
+        ----------
+        capacity : int, optional
+            Number of bytes preallocated.
+        policy : str, optional
+            `overwrite` for discard the oldest bytes or `spill` for write them
+            into `spill` before discard.
+        spill : str, file object, optional
+            Filename or binary file for the spilled bytes, required for the
+            `spill` policy.
+        """
+
+        if not policy in self.POLICIES:
+            raise Exception('Policy {} is not available'.format(policy))
+
+        if policy == 'spill' and spill is None:
+            raise Exception('A spill file is required for the spill policy')
+
+        if isinstance(spill, str):
+            spill = open(spill, 'ab')
+
+        self.DATA = bytearray(capacity)
+        self.CAPACITY = capacity
+        self.POLICY = policy
+        self.SPILL = spill
+
+        self.start = 0  # Absolute offset of the oldest byte
+        self.end = 0  # Absolute offset after the newest byte
+        self.lock = Lock()
+
+
+    #----------------------------------------------------------------------
+    def __len__(self):
+        """Total number of bytes written."""
+
+        return self.end
+
+
+    #----------------------------------------------------------------------
+    def __bool__(self):
+        """"""
+        return self.end > self.start
+
+
+    #----------------------------------------------------------------------
+    @property
+    def available(self):
+        """Number of bytes still stored."""
+
+        return self.end - self.start
+
+
+    #----------------------------------------------------------------------
+    def extend(self, data):
+        """Append new bytes, discarding the oldest ones if is required.
+
+        Parameters
+        ----------
+        data : bytes, bytearray, list
+            New raw data.
+        """
+
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+
+        with self.lock:
+            size = len(data)
+
+            if size > self.CAPACITY:
+                self.__discard__(self.end)
+                self.__spill__(data[:size - self.CAPACITY])
+                self.start = self.end = self.end + size - self.CAPACITY
+                data = data[size - self.CAPACITY:]
+                size = self.CAPACITY
+
+            if self.end + size - self.start > self.CAPACITY:
+                self.__discard__(self.end + size - self.CAPACITY)
+
+            index = self.end % self.CAPACITY
+            first = min(size, self.CAPACITY - index)
+            self.DATA[index:index + first] = data[:first]
+            self.DATA[:size - first] = data[first:]
+
+            self.end += size
+
+
+    #----------------------------------------------------------------------
+    def release(self, offset):
+        """Discard the bytes before `offset`, they are already consumed.
+
+        Parameters
+        ----------
+        offset : int
+            Absolute offset.
+        """
+
+        with self.lock:
+            self.__discard__(min(offset, self.end))
+
+
+    #----------------------------------------------------------------------
+    def view(self, start, stop=None):
+        """Return a copy of the bytes between two absolute offsets.
+
+        The bytes are copied while the buffer is locked, the writer thread
+        can overwrite the region as soon as the lock is released.
+
+        Parameters
+        ----------
+        start : int
+            Absolute offset, must not be older than `start`.
+        stop : int, optional
+            Absolute offset, not included.
+
+        Returns
+        -------
+        bytes
+            The stored bytes in the range.
+        """
+
+        with self.lock:
+            return bytes(self.__view__(start, stop))
+
+
+    #----------------------------------------------------------------------
+    def __view__(self, start, stop=None):
+        """Bytes between two absolute offsets, without copy when they are
+        contiguous. Only valid while the lock is held."""
+
+        if stop is None:
+            stop = self.end
+
+        start = max(start, self.start)
+        stop = min(max(stop, start), self.end)
+
+        a = start % self.CAPACITY
+        b = a + stop - start
+
+        if b <= self.CAPACITY:
+            return memoryview(self.DATA)[a:b]
+
+        return bytes(self.DATA[a:]) + bytes(self.DATA[:b - self.CAPACITY])
+
+
+    #----------------------------------------------------------------------
+    def __getitem__(self, index):
+        """Absolute indexing, slices return bytes."""
+
+        if isinstance(index, slice):
+            start = self.start if index.start is None else index.start
+            return self.view(start, index.stop)
+
+        if not self.start <= index < self.end:
+            raise IndexError('Byte {} is not available'.format(index))
+
+        return self.DATA[index % self.CAPACITY]
+
+
+    #----------------------------------------------------------------------
+    def __bytes__(self):
+        """Bytes still stored, from the oldest one."""
+
+        return self.view(self.start, self.end)
+
+
+    #----------------------------------------------------------------------
+    def clear(self):
+        """Discard all the stored bytes, the offsets are preserved."""
+
+        with self.lock:
+            self.__discard__(self.end)
+
+
+    #----------------------------------------------------------------------
+    def close(self):
+        """Spill the stored bytes and close the spill file."""
+
+        if self.SPILL:
+            self.clear()
+            self.SPILL.close()
+            self.SPILL = None
+
+
+    #----------------------------------------------------------------------
+    def __discard__(self, offset):
+        """Move the oldest byte to `offset`, spilling the discarded bytes."""
+
+        if offset <= self.start:
+            return
+
+        self.__spill__(self.__view__(self.start, offset))
+        self.start = offset
+
+
+    #----------------------------------------------------------------------
+    def __spill__(self, data):
+        """Write the discarded bytes into the spill file."""
+
+        if self.POLICY == 'spill' and len(data):
+            self.SPILL.write(data)
+
+
+
+
+########################################################################
+class DataNotifier:
+    """Notification channel between the device reader and the decoder.
+
+    The reader calls `notify` when new frames could be completed and the
+    decoder blocks on `wait` instead of sleep-polling the buffer. The arrival
+    time of the oldest pending notification is kept for latency measures.
+    """
+
+    #----------------------------------------------------------------------
+    def __init__(self):
+        """"""
+
+        self.condition = Condition()
+        self.arrival = None  # Oldest notification not consumed yet
+
+
+    #----------------------------------------------------------------------
+    def notify(self):
+        """Wake the waiting consumers."""
+
+        with self.condition:
+            if self.arrival is None:
+                self.arrival = time.monotonic()
+            self.condition.notify_all()
+
+
+    #----------------------------------------------------------------------
+    def wait(self, timeout=None):
+        """Block until a notification arrives.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait in seconds.
+
+        Returns
+        -------
+        bool
+            `False` if the timeout expired without notifications.
+        """
+
+        with self.condition:
+            return self.condition.wait_for(lambda: self.arrival is not None, timeout)
+
+
+    #----------------------------------------------------------------------
+    def consume(self):
+        """Mark the pending notifications as attended.
+
+        Returns
+        -------
+        float
+            Arrival time (`time.monotonic`) of the oldest pending notification
+            or `None`.
+        """
+
+        with self.condition:
+            arrival = self.arrival
+            self.arrival = None
+            return arrival
@@ -0,0 +1,254 @@
+"""
+=======
+Capture
+=======
+
+Raw capture of the received bytes into rolling segment files.
+
+The data is written as it arrives with buffered writes and periodic `fsync`,
+a new segment is started when the current one reaches a size or a duration.
+The segments are splitted just after the delimiter that closes a frame, so
+each one can be decoded alone:
+
+.. code:: ipython3
+
+    device = GEDevice(buffer='ring', capture='captures/case_0042')
+
+    # or
+    capture = SegmentedCapture('captures/case_0042', max_bytes=2**26, max_seconds=600)
+    device = GEDevice(buffer='ring', capture=capture)
+
+The `manifest.json` lists the segments with their first and last `r_time`:
+
+.. code:: ipython3
+
+    capture.segments
+    [{'filename': 'capture-0000.raw', 'bytes': 67108942, 'first_time': 1533220221, 'last_time': 1533220891, ...}, ...]
+
+"""
+
+import os
+import json
+import time
+
+import numpy as np
+
+from .dataconstants import CONST
+from .deframe import Deframer
+
+MANIFEST = 'manifest.json'
+
+# Offset of `r_time` in the datex header
+R_TIME = slice(6, 10)
+
+
+########################################################################
+class SegmentedCapture:
+    """Append the raw data to segment files with automatic rollover."""
+
+    #----------------------------------------------------------------------
+    def __init__(self, path, prefix='capture', max_bytes=2**26, max_seconds=None, fsync_interval=5, buffering=2**16):
+        """
+        Parameters
+        ----------
+        path : str
+            Directory for the segments, an existing capture is continued with
+            new segments.
+        prefix : str, 'capture'
+            Prefix of the segment filenames.
+        max_bytes : int, 2**26
+            Size of each segment.
+        max_seconds : float, optional
+            Duration of each segment.
+        fsync_interval : float, 5
+            Seconds between each `fsync`, the data written before is durable.
+        buffering : int, 2**16
+            Bytes buffered before each write.
+        """
+
+        self.path = path
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.fsync_interval = fsync_interval
+        self.buffering = buffering
+
+        os.makedirs(path, exist_ok=True)
+
+        if os.path.exists(os.path.join(path, MANIFEST)):
+            with open(os.path.join(path, MANIFEST)) as file:
+                self.segments = json.load(file)['segments']
+        else:
+            self.segments = []
+
+        self.file = None
+        self.opened = None
+        self.synced = None
+        self.rollover = False
+
+        # Frames for the `r_time` and delimiters for the splits
+        self.frames = Deframer()
+        self.scanner = Deframer()
+
+
+    #----------------------------------------------------------------------
+    @property
+    def segment(self):
+        """Manifest entry of the current segment."""
+
+        return self.segments[-1] if self.file else None
+
+
+    #----------------------------------------------------------------------
+    def write(self, data):
+        """Append the received bytes.
+
+        Parameters
+        ----------
+        data : bytes, bytearray, list
+            Raw data.
+        """
+
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+
+        if not len(data):
+            return
+
+        if self.file is None:
+            self.__open__()
+
+        if not self.rollover:
+            self.rollover = self.segment['bytes'] >= self.max_bytes
+            if self.max_seconds is not None:
+                self.rollover = self.rollover or time.monotonic() - self.opened >= self.max_seconds
+
+        # The new segment starts after the delimiter that closes a frame
+        if self.rollover:
+            split = self.__split__(data)
+            if split is not None:
+                self.__append__(data[:split])
+                self.__close__()
+                self.__open__()
+                data = data[split:]
+
+        self.scanner.skip(data)
+        self.__append__(data)
+
+        if time.monotonic() - self.synced >= self.fsync_interval:
+            self.sync()
+
+
+    #----------------------------------------------------------------------
+    def __split__(self, data):
+        """Offset after the first delimiter that closes a frame.
+
+        Returns
+        -------
+        int
+            Offset in `data`, `None` if no frame is closed.
+        """
+
+        scanner = Deframer(self.scanner.storing, self.scanner.bitshift)
+        scanner.carry = self.scanner.carry
+
+        begin = 0
+        for position in np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == CONST.FRAMECHAR).tolist():
+            storing = scanner.storing
+            scanner.skip(data[begin:position + 1])
+            begin = position + 1
+
+            if storing and not scanner.storing:
+                self.scanner = scanner
+                return begin
+
+        return None
+
+
+    #----------------------------------------------------------------------
+    def __append__(self, data):
+        """Write the data into the current segment and update its times."""
+
+        if not len(data):
+            return
+
+        self.file.write(data)
+        self.segment['bytes'] += len(data)
+
+        for frame in self.frames.feed(data):
+            r_time = int.from_bytes(bytes(frame[R_TIME]), 'little')
+            if self.segment['first_time'] is None:
+                self.segment['first_time'] = r_time
+            self.segment['last_time'] = r_time
+            self.segment['frames'] += 1
+
+
+    #----------------------------------------------------------------------
+    def __open__(self):
+        """Start a new segment."""
+
+        filename = '{}-{:04d}.raw'.format(self.prefix, len(self.segments))
+
+        self.segments.append({
+            'filename': filename,
+            'bytes': 0,
+            'frames': 0,
+            'first_time': None,
+            'last_time': None,
+            'created': time.time(),
+            'closed': False,
+
+            # Deframer state at the first byte, a new segment is idle
+            'storing': self.scanner.storing,
+            'bitshift': self.scanner.bitshift,
+        })
+
+        self.file = open(os.path.join(self.path, filename), 'wb', buffering=self.buffering)
+        self.opened = self.synced = time.monotonic()
+        self.rollover = False
+
+        self.__save_manifest__()
+
+
+    #----------------------------------------------------------------------
+    def __close__(self):
+        """Finish the current segment."""
+
+        self.segment['closed'] = True
+        self.sync()
+        self.file.close()
+        self.file = None
+
+
+    #----------------------------------------------------------------------
+    def sync(self):
+        """Write the buffered data to the disk and update the manifest."""
+
+        if self.file is None:
+            return
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.synced = time.monotonic()
+
+        self.__save_manifest__()
+
+
+    #----------------------------------------------------------------------
+    def __save_manifest__(self):
+        """Replace the manifest atomically."""
+
+        filename = os.path.join(self.path, MANIFEST)
+        with open(filename + '.tmp', 'w') as file:
+            json.dump({'segments': self.segments, }, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(filename + '.tmp', filename)
+
+
+    #----------------------------------------------------------------------
+    def close(self):
+        """Finish the current segment, the next write starts a new one."""
+
+        if self.file is not None:
+            self.__close__()
@@ -12,31 +12,71 @@ to process new data added to the buffer.
     decoder.process(True)
 
 
+The decoder can wake up as soon as the device receives new frames:
+
+.. code:: ipython3
+
+    decoder = GEDecode(device.BUFFER, notifier=device.NOTIFIER)
+    decoder.process(True, window=0.05)
+
+    decoder.latency()  # {50: ..., 90: ..., 99: ...}
+
+
+The records can be decoded one at a time, without retain them:
+
+.. code:: ipython3
+
+    for record in iter_records(sys.stdin.buffer):
+        print(record.maintype, record.time)
+
+
+Large raw captures can be decoded from a memory-mapped file:
+
+.. code:: ipython3
+
+    decoder = GEDecode.from_file('capture.raw')
+
+
 There are a set of methods for clear correctly the stored buffer and recollected data.
 
 .. code:: ipython3
 
     device.clear_buffer()  # clear input buffer.
     decoder.clear_buffer()  # clear decoded data, breaks the synchrony.
+    decoder.clear_view()  # clear displayed data, exports keep all the data.
     decoder.clear_data()  # clear recollected data.
 
 """
 
 import os
+import mmap
 import time
 import struct
 import json
+import asyncio
+from collections import deque, namedtuple
+from functools import partial
 from threading import Thread
 from datetime import datetime, timedelta, date
 
+from .buffer import RingBuffer
 from .dataconstants import CONST
+from .deframe import Deframer
+from .export import CSVExporter
 from .edfwriter import EDF, EDFChannel
-from .headers import DatexHeaderResponse, PhysiologicalData, HeaderHandler
+from .headers import DatexHeaderResponse, PhysiologicalData, PHDB_SUBCLASSES
 from .measures import WAVEFORMS_DICT, LABEL_TO_DICT, GROUPS_DICT
+from .storage import WaveformStore, WaveformView, SubrecordStore
 
 from pandas import DataFrame, np
 
 
+# Decoded records delivered to the listeners and to `GEDecode.stream`, the
+# raw samples of a `WaveBlock` are scaled with `storage.scale_samples`
+WaveBlock = namedtuple('WaveBlock', ['maintype', 'time', 'name', 'samples', 'shift'])
+DisplayRecord = namedtuple('DisplayRecord', ['maintype', 'time', 'datetime', 'values'])
+
+
 ########################################################################
 class GEDecode:
     """Decode raw data into Pandas DataFrames.
@@ -46,10 +86,16 @@ class GEDecode:
       * `DATA_SUBRECORD`: Pandas DataFrame with the subrecords data.
       * `DATA_WAVE`: Dictionary with waveform name as key with the
          Pandas DataFrame with the waveform data.
+
+    Both are views with a read cursor over a single storage, `clear_view`
+    hides the data decoded until now while the exports still read all the
+    data from the start.
     """
 
+    ENGINES = ['numpy', 'python']
+
     #----------------------------------------------------------------------
-    def __init__(self, buffer, filter_subrecords=None, filter_waveforms=None):
+    def __init__(self, buffer, filter_subrecords=None, filter_waveforms=None, engine='numpy', release=False, notifier=None, store=True):
         """
         Parameters
         ----------
@@ -60,8 +106,23 @@ class GEDecode:
            Sublist with desired subrecords, if empty then will process all available measures.
         filter_waveforms: array, optional
            List of desired waveforms, if emty then will process all requested waveforms.
+        engine: str, 'numpy'
+           Frame search engine, `numpy` for the vectorized `Deframer` that
+           process whole chunks or `python` for the byte-at-a-time state machine.
+        release: bool, False
+           Delete the consumed bytes from `buffer` (list, bytearray or
+           `RingBuffer`), the raw data will not be available for `save_as_raw`.
+        notifier: DataNotifier, optional
+           Notifications from the device (`GEDevice.NOTIFIER`), the
+           continuous processing will wake up when new data arrives.
+        store: bool, True
+           Keep the decoded data in `DATA_SUBRECORD` and `DATA_WAVE`, without
+           store the records are only delivered to the listeners.
         """
 
+        if not engine in self.ENGINES:
+            raise Exception('Engine {} is not available'.format(engine))
+
         self.m_list = []
         self.record_list = []
         self.frame_list = []
@@ -72,13 +133,13 @@ class GEDecode:
         if filter_waveforms is None:
             filter_waveforms = []
 
-        # Display user data
-        self.DATA_SUBRECORD = DataFrame()
-        self.DATA_WAVE = {}
+        # Decoded data, shared by the user views and the exports
+        self.STORE_SUBRECORD = SubrecordStore()
+        self.STORE_WAVE = WaveformStore()
 
-        # Read and write intern data
-        self.__DATA_SUBRECORD__ = DataFrame()
-        self.__DATA_WAVE__ = {}
+        # Read cursors for display user data
+        self.CURSOR_SUBRECORD = 0
+        self.VIEW_WAVE = WaveformView(self.STORE_WAVE)
 
         # Modules, groups and measures availables
         self.MODULES = []
@@ -91,15 +152,34 @@ class GEDecode:
 
         # Temporal and permanent buffers
         self.BUFFER = buffer
-        self.PROCCESED_BUFFER = []
+        self.OFFSET = 0  # Bytes of BUFFER already consumed
+        self.RELEASE = release
         self.PROCESSING = False
 
+        # Wake up on new data and latencies in seconds from the data arrival
+        self.NOTIFIER = notifier
+        self.LATENCY = deque(maxlen=2**12)
+
+        # Callbacks for each decoded `WaveBlock` and `DisplayRecord`
+        self.LISTENERS = []
+        self.STORE = store
+
+        # Last raw physiological record, for the extraction plan
+        self.IMAGE = bytearray(PhysiologicalData.LENGTH)
+
+        # Status of the modules, recomputed only when the status bits change
+        self.STATUS = ModuleStatus()
+        self.STATUS_KEY = None
+
         self.m_fstart = True
         self.m_storestart = False
         self.m_storeend = False
         self.m_bitshiftnext = False
         self.m_transmissionstart = True
 
+        self.ENGINE = engine
+        self.deframer = Deframer()
+
         # Default header can be empty
         self.edf_header = {}
 
@@ -107,6 +187,121 @@ class GEDecode:
         self.__processing__()
 
 
+    #----------------------------------------------------------------------
+    @classmethod
+    def from_file(cls, filename, window=2**20, **kwargs):
+        """Decode a raw capture from a memory-mapped file.
+
+        The file is decoded in windows of `window` bytes straight from the
+        map and the pages already consumed are released, so the memory used
+        by the raw data does not depend on the size of the capture.
+
+        Parameters
+        ----------
+        filename: str
+           Raw file, as stored by `save_as_raw`.
+        window: int, 2**20
+           Bytes decoded each time.
+        kwargs: dict
+           Arguments for `GEDecode`.
+
+        Returns
+        -------
+        GEDecode
+            Decoder with the data, without buffer.
+        """
+
+        decoder = cls([], **kwargs)
+
+        with open(filename, 'rb') as file:
+
+            if not os.fstat(file.fileno()).st_size:
+                return decoder
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+
+                if hasattr(buffer, 'madvise'):
+                    buffer.madvise(mmap.MADV_SEQUENTIAL)
+
+                decoder.BUFFER = buffer
+                released = 0
+
+                while decoder.OFFSET < len(buffer):
+                    decoder.__processing__(stop=decoder.OFFSET + window)
+
+                    # The consumed pages are not required anymore
+                    end = decoder.OFFSET - decoder.OFFSET % mmap.PAGESIZE
+                    if hasattr(mmap, 'MADV_DONTNEED') and end > released:
+                        buffer.madvise(mmap.MADV_DONTNEED, released, end - released)
+                        released = end
+
+                decoder.clear_buffer()
+
+        return decoder
+
+
+    #----------------------------------------------------------------------
+    @property
+    def DATA_SUBRECORD(self):
+        """DataFrame with the subrecords decoded after the last `clear_view`."""
+
+        return self.STORE_SUBRECORD.dataframe(self.CURSOR_SUBRECORD)
+
+
+    #----------------------------------------------------------------------
+    @DATA_SUBRECORD.setter
+    def DATA_SUBRECORD(self, dataframe):
+        """Only an empty DataFrame can be assigned, it resets the view."""
+
+        if len(dataframe):
+            raise Exception('DATA_SUBRECORD is a view, only can be cleared')
+
+        self.CURSOR_SUBRECORD = len(self.STORE_SUBRECORD)
+
+
+    #----------------------------------------------------------------------
+    @property
+    def DATA_WAVE(self):
+        """Waveforms decoded after the last `clear_view`."""
+
+        return self.VIEW_WAVE
+
+
+    #----------------------------------------------------------------------
+    @DATA_WAVE.setter
+    def DATA_WAVE(self, data):
+        """Only an empty dictionary can be assigned, it resets the view."""
+
+        if len(data):
+            raise Exception('DATA_WAVE is a view, only can be cleared')
+
+        self.VIEW_WAVE.reset()
+
+
+    #----------------------------------------------------------------------
+    @property
+    def __DATA_SUBRECORD__(self):
+        """DataFrame with all the decoded subrecords, used for exports."""
+
+        return self.STORE_SUBRECORD.dataframe()
+
+
+    #----------------------------------------------------------------------
+    @property
+    def __DATA_WAVE__(self):
+        """All the decoded waveforms, used for exports."""
+
+        return self.STORE_WAVE
+
+
+    #----------------------------------------------------------------------
+    @property
+    def PROCCESED_BUFFER(self):
+        """Bytes of the buffer already processed."""
+
+        return self.BUFFER[:self.OFFSET]
+
+
     #----------------------------------------------------------------------
     def clear_buffer(self):
         """Clear the processed buffer.
@@ -115,22 +310,30 @@ class GEDecode:
         """
 
         self.BUFFER = []
-        self.PROCCESED_BUFFER = []
+        self.OFFSET = 0
+
+
+    #----------------------------------------------------------------------
+    def clear_view(self):
+        """Clear the display user data, the exports keep all the data."""
+
+        self.CURSOR_SUBRECORD = len(self.STORE_SUBRECORD)
+        self.VIEW_WAVE.reset()
 
 
     #----------------------------------------------------------------------
     def clear_data(self):
         """Clear the processed data."""
 
-        self.DATA_SUBRECORD = DataFrame()
-        self.DATA_WAVE = {}
-        self.__DATA_SUBRECORD__ = DataFrame()
-        self.__DATA_WAVE__ = {}
+        self.STORE_SUBRECORD = SubrecordStore()
+        self.STORE_WAVE = WaveformStore()
+        self.CURSOR_SUBRECORD = 0
+        self.VIEW_WAVE = WaveformView(self.STORE_WAVE)
         # self.DATA_TREND_10S = DataFrame()
 
 
     #----------------------------------------------------------------------
-    def process(self, flag=True, delay=1):
+    def process(self, flag=True, delay=1, window=0, event=None):
         """Enable or disable the continuous data processing.
 
         Parameters
@@ -138,62 +341,298 @@ class GEDecode:
         flag: bool, True
            Enable or disable the continuous data processing.
         delay: integer in seconds
-           Delay in seconds between each process attempt.
+           Delay in seconds between each process attempt, with notifications
+           is the maximum time waiting for new data.
+        window: float in seconds, 0
+           With notifications, time to wait for more data after the first one
+           arrives, trade latency for bigger batches.
+        event: bool, optional
+           Wake up with the notifications, by default if a `notifier` was
+           configured.
         """
 
+        if event is None:
+            event = self.NOTIFIER is not None
+
+        if event and self.NOTIFIER is None:
+            raise Exception('A notifier is required for the event-driven processing')
+
         self.PROCESSING = flag
 
         if self.PROCESSING:
-            self.thr_process = Thread(target=self.__continuous_processing__, args=(delay, ))
+            self.thr_process = Thread(target=self.__continuous_processing__, args=(delay, window, event))
             self.thr_process.start()
 
 
     #----------------------------------------------------------------------
-    def __continuous_processing__(self, delay=1/4):
+    def __continuous_processing__(self, delay=1/4, window=0, event=False):
         """Continuous processing.
 
         Parameters
         ----------
         delay: integer in seconds
            Delay in seconds between each attempted processing.
+        window: float in seconds, 0
+           Batching window after a notification.
+        event: bool, False
+           Wait for notifications instead of sleep.
         """
 
         while self.PROCESSING:
-            time.sleep(delay)
+
+            if event:
+                if not self.NOTIFIER.wait(timeout=delay):
+                    continue
+                if window:
+                    time.sleep(window)
+            else:
+                time.sleep(delay)
+
+            arrival = self.NOTIFIER.consume() if self.NOTIFIER else None
             self.__processing__()
 
+            if arrival is not None:
+                self.LATENCY.append(time.monotonic() - arrival)
+
+
+    #----------------------------------------------------------------------
+    async def stream(self, delay=1):
+        """Asynchronous iteration over the decoded records.
+
+        The buffer is processed in the event loop, with an asynchronous
+        notifier (`AsyncGEDevice.NOTIFIER`) the processing starts when new
+        data arrives, otherwise each `delay` seconds.
+
+        Parameters
+        ----------
+        delay: float in seconds, 1
+           Delay between each process attempt or maximum time waiting for
+           notifications.
+
+        Yields
+        ------
+        WaveBlock, DisplayRecord
+            Decoded waveform blocks and display subrecords.
+        """
+
+        records = deque()
+        listener = records.append
+        self.add_listener(listener)
+
+        event = self.NOTIFIER is not None and asyncio.iscoroutinefunction(self.NOTIFIER.wait)
+
+        try:
+            while True:
+
+                while records:
+                    yield records.popleft()
+
+                if event:
+                    await self.NOTIFIER.wait(timeout=delay)
+                else:
+                    await asyncio.sleep(delay)
+
+                arrival = self.NOTIFIER.consume() if self.NOTIFIER else None
+                self.__processing__()
+
+                if arrival is not None and records:
+                    self.LATENCY.append(time.monotonic() - arrival)
+
+        finally:
+            self.remove_listener(listener)
+
+
+    #----------------------------------------------------------------------
+    def add_listener(self, callback):
+        """Call `callback` with each new `WaveBlock` and `DisplayRecord`.
+
+        Parameters
+        ----------
+        callback: callable
+           Function with the decoded record as the only argument.
+        """
+
+        self.LISTENERS.append(callback)
+
+
+    #----------------------------------------------------------------------
+    def remove_listener(self, callback):
+        """Remove a callback added with `add_listener`.
+
+        Parameters
+        ----------
+        callback: callable
+           Function registered.
+        """
+
+        if callback in self.LISTENERS:
+            self.LISTENERS.remove(callback)
+
+
+    #----------------------------------------------------------------------
+    def __emit__(self, record):
+        """Deliver a decoded record to the listeners."""
+
+        for callback in self.LISTENERS:
+            callback(record)
+
+
+    #----------------------------------------------------------------------
+    def on_module_change(self, date_):
+        """Overwritable method.
+
+        Called when `MODULES`, `MODULES_ACTIVE` or `MEANSURES_AVAILABLE`
+        change, the lists are already updated.
+
+        Parameters
+        ----------
+        date_ : Datetime object
+            Datetime of the record with the new status.
+        """
+
+
+    #----------------------------------------------------------------------
+    def latency(self, percentiles=(50, 90, 99)):
+        """Percentiles of the time between the data arrival and its decoding.
+
+        Only available when the decoder has a `notifier`, the last 4096
+        processing cycles are considered.
+
+        Parameters
+        ----------
+        percentiles: list, (50, 90, 99)
+           Percentiles to compute.
+
+        Returns
+        -------
+        dict
+            Percentile as key and latency in seconds as value.
+        """
+
+        if not self.LATENCY:
+            return {p: None for p in percentiles}
+
+        values = np.percentile(list(self.LATENCY), percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
 
     #----------------------------------------------------------------------
-    def __processing__(self):
-        """Process the input buffer one byte at a time.
+    def __processing__(self, stop=None):
+        """Process the new bytes in the input buffer.
+
+        Only the bytes after the consumed offset are copied, so the cost
+        depends on the new data and not on the size of the buffer. The new
+        bytes of a `RingBuffer` are copied while it is locked.
 
-        Process the input buffer until a header is completed.
+        Parameters
+        ----------
+        stop: int, optional
+           Process the buffer only until this offset.
         """
 
-        bytes_ = self.BUFFER[len(self.PROCCESED_BUFFER):]
-        self.PROCCESED_BUFFER = self.BUFFER[:]
+        end = len(self.BUFFER)
+
+        if stop is not None:
+            end = min(end, stop)
+
+        if isinstance(self.BUFFER, RingBuffer):
+            # A copy made under the lock, the writer can not change it
+            bytes_ = self.BUFFER.view(self.OFFSET, end)
+
+            # The oldest bytes were overwritten before being decoded
+            if len(bytes_) < end - self.OFFSET:
+                self.__resynchronize__()
+        else:
+            bytes_ = self.BUFFER[self.OFFSET:end]
+
+        self.OFFSET = end
+
+        if self.RELEASE and isinstance(self.BUFFER, (list, bytearray)):
+            del self.BUFFER[:end]
+            self.OFFSET = 0
+
+        if self.ENGINE == 'numpy':
+            self.frame_list = self.deframer.feed(bytes_)
+            self.__read_framelist__()
+        else:
+            for byte in bytes_:
+
+                self.__create_framelist__(byte)
+
+                if self.frame_list:
+                    self.__read_framelist__()
 
-        for byte in bytes_:
+        if self.RELEASE and isinstance(self.BUFFER, RingBuffer):
+            self.BUFFER.release(end)
 
-            self.__create_framelist__(byte)
 
-            if self.frame_list:
-                record_list = self.__create_recordlist__()
+    #----------------------------------------------------------------------
+    def __resynchronize__(self):
+        """Discard the partial frame, the next one will be searched."""
+
+        self.deframer.reset()
+        self.m_list = []
+        self.m_storestart = False
+        self.m_bitshiftnext = False
+
+
+    #----------------------------------------------------------------------
+    def __read_framelist__(self):
+        """Decode the completed frames and empty the frame list."""
 
-                self.read_subrecords(record_list[:])
-                self.read_waveforms(record_list[:])
+        if not self.frame_list:
+            return
 
-                self.frame_list = []
+        record_list = self.__create_recordlist__()
+
+        self.read_subrecords(record_list[:])
+        self.read_waveforms(record_list[:])
+
+        self.frame_list = []
 
 
     #----------------------------------------------------------------------
-    def save_as_csv(self, filename):
+    def save_as_csv(self, filename, compression=None, chunksize=2**16):
         """Save the decoded data into a set of CSV files.
 
+        The files are written in chunks by a `CSVExporter`, that can be used
+        directly for incremental or background exports.
+
         Parameters
         ----------
         filename : str
             Absolute or realtive path for CSV file.
+        compression : str, optional
+            `gzip`, `bz2` or `xz`.
+        chunksize : int, 2**16
+            Maximum rows converted to text each time.
+
+        Returns
+        -------
+        list
+            A list with filenames generated.
+        """
+
+        exporter = CSVExporter(self, filename, compression, chunksize)
+        filenames = exporter.export()
+        exporter.close()
+
+        return filenames
+
+
+    #----------------------------------------------------------------------
+    def save_as_npz(self, filename):
+        """Save the decoded data into a columnar NumPy file.
+
+        Each column is stored as an array: `subrecord/<label>` for the
+        subrecords, `<waveform>/datetime`, `<waveform>/values` and
+        `<waveform>/status` (special codes) for the waveforms. Non numeric
+        values are stored as strings.
+
+        Parameters
+        ----------
+        filename : str
+            Absolute or realtive path for NPZ file.
 
         Returns
         -------
@@ -204,21 +643,28 @@ class GEDecode:
         if os.path.exists(os.path.dirname(os.path.abspath(filename))):
             os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
 
-        if not '.csv' in filename:
-            filename = filename + '.csv'
+        if not '.npz' in filename:
+            filename = filename + '.npz'
 
-        filenames = []
+        arrays = {}
 
-        if not self.__DATA_SUBRECORD__.empty:
-            self.__DATA_SUBRECORD__.to_csv(filename)
-            filenames.append(filename)
+        if not self.STORE_SUBRECORD.empty:
+            for label, column in self.__DATA_SUBRECORD__.items():
+                values = column.to_numpy()
+                if values.dtype == object:
+                    values = values.astype(str)
+                arrays['subrecord/{}'.format(label)] = values
 
-        if self.__DATA_WAVE__:
-            for df in self.__DATA_WAVE__:
-                self.__DATA_WAVE__[df].to_csv(filename.replace('.csv', '.{}.csv'.format(df)))
-                filenames.append(filename.replace('.csv', '.{}.csv'.format(df)))
+        for name in self.__DATA_WAVE__:
+            dataframe = self.__DATA_WAVE__[name]
+            arrays['{}/datetime'.format(name)] = dataframe['datetime'].to_numpy()
+            arrays['{}/values'.format(name)] = dataframe['values'].to_numpy()
+            arrays['{}/status'.format(name)] = self.__DATA_WAVE__.status(name)
 
-        return filenames
+        if arrays:
+            np.savez_compressed(filename, **arrays)
+            return [filename]
+        return []
 
 
     #----------------------------------------------------------------------
@@ -291,7 +737,7 @@ class GEDecode:
 
 
     #----------------------------------------------------------------------
-    def save_as_edf(self, filename, edf_header=None, annotations=None):
+    def save_as_edf(self, filename, edf_header=None, annotations=None, digital=True):
         """Save the decoded data into a set of EDF+ files.
 
         Parameters
@@ -302,6 +748,10 @@ class GEDecode:
         edf_header: dict
             Declare the EDF+ patient header.
 
+        digital: bool, True
+            Write the waveforms as the original 16 bits samples, with the
+            physical range derived from the scale, see `save_waves_as_edf`.
+
         Returns
         -------
         list
@@ -329,15 +779,22 @@ class GEDecode:
 
 
         # Differents EDF because will have different startdate
-        l1 = self.save_waves_as_edf(filename, edf_header, annotations)
+        l1 = self.save_waves_as_edf(filename, edf_header, annotations, digital)
         l2 = self.save_disp_as_edf(filename, edf_header, annotations)
 
         return l1 + l2
 
 
     #----------------------------------------------------------------------
-    def save_waves_as_edf(self, filename, edf_header, annotations):
-        """"""
+    def save_waves_as_edf(self, filename, edf_header, annotations, digital=True):
+        """Save the waveforms into an EDF+ file.
+
+        With `digital` the original signed 16 bits samples are written
+        without conversions, the physical range is the digital range
+        multiplied by the scale of the waveform so the export is lossless.
+        The special values are written as 0. If a waveform has many scales
+        all the waveforms are converted to physical values.
+        """
 
         if os.path.exists(os.path.dirname(os.path.abspath(filename))):
             os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
@@ -358,12 +815,33 @@ class GEDecode:
         edf = EDF(filename)
         edf.set_header(**edf_header)
 
-        # NOTE: ``first_datetime`` is already a python datetime, so do not need ``fromtimestamp``.
-        first_datetime = self.__DATA_WAVE__[list(self.__DATA_WAVE__.keys())[0]]['datetime'][0]
+        # NOTE: the first block time is a unix time, the same of the ``datetime`` column.
+        first_time = self.__DATA_WAVE__.blocks[list(self.__DATA_WAVE__.keys())[0]].array()['time'][0]
         # edf.header.update({'startdate': datetime.fromtimestamp(first_datetime),})
-        edf.header.update({'startdate': first_datetime})
+        edf.header.update({'startdate': datetime(1970, 1, 1) + timedelta(seconds=int(first_time))})
+
+        if digital:
+            waves = {df: self.__DATA_WAVE__.digital(df) for df in self.__DATA_WAVE__}
+            digital = all(shift is not None for _, shift in waves.values())
 
         for df in self.__DATA_WAVE__:
+
+            # Original samples, the physical range is the digital one scaled
+            if digital:
+                samples, shift = waves[df]
+                channel = EDFChannel(samples)
+                channel['label'] = df
+                channel['dimension'] = WAVEFORMS_DICT[df]['unit']
+                channel['sample_rate'] = WAVEFORMS_DICT[df]['samps']
+                channel['physical_min'] = -2 ** 15 * shift
+                channel['physical_max'] = (2 ** 15 - 1) * shift
+                channel['digital_min'] = -2 ** 15
+                channel['digital_max'] = 2 ** 15 - 1
+                channel['transducer'] = WAVEFORMS_DICT[df]['transducer']
+                channel['prefilter'] = WAVEFORMS_DICT[df]['prefilter']
+                edf.add_channel(channel)
+                continue
+
             wave = self.__DATA_WAVE__[df]
             data = np.nan_to_num(np.array(wave['values'].tolist(), dtype=np.float))
             channel = EDFChannel(data)
@@ -382,7 +860,7 @@ class GEDecode:
                 channel['physical_max'] = np.ceil(max(data))
 
             channel['digital_min'] = -2 ** 15
-            channel['digital_max'] = 2 ** 15
+            channel['digital_max'] = 2 ** 15 - 1
             channel['transducer'] = WAVEFORMS_DICT[df]['transducer']
             channel['prefilter'] = WAVEFORMS_DICT[df]['prefilter']
             edf.add_channel(channel)
@@ -390,7 +868,7 @@ class GEDecode:
         for annotation in annotations:
             edf.write_annotation(**annotation)
 
-        edf.save()
+        edf.save(digital=digital)
         return [filename]
 
 
@@ -401,7 +879,7 @@ class GEDecode:
         if os.path.exists(os.path.dirname(os.path.abspath(filename))):
             os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
 
-        if self.__DATA_SUBRECORD__.empty:
+        if self.STORE_SUBRECORD.empty:
             return []
 
         if not '.edf' in filename:
@@ -418,18 +896,19 @@ class GEDecode:
         edf.set_header(**edf_header)
 
         # NOTE: ``first_datetime`` will be of type int/float, so need ``fromtimestamp`` to become in a python datetime object.
-        first_datetime = json.loads(self.__DATA_SUBRECORD__.iloc[0].to_json()).pop('datetime') / 1e3
+        subrecords = self.__DATA_SUBRECORD__
+        first_datetime = json.loads(subrecords.iloc[0].to_json()).pop('datetime') / 1e3
         # edf.header.update({'startdate': datetime.fromtimestamp(first_datetime),})
         edf.header.update({'startdate': datetime.fromtimestamp(first_datetime),})
 
 
-        keys = list(self.__DATA_SUBRECORD__.columns)
+        keys = list(subrecords.columns)
 
         for key in keys:
             if key == 'datetime':
                 continue
 
-            data = self.__DATA_SUBRECORD__[key].tolist()
+            data = subrecords[key].tolist()
             # If the first data is not a number, then the array conains labels
             if not isinstance(data[0], (int, float)):
                 continue
@@ -470,7 +949,7 @@ class GEDecode:
 
 
             channel['digital_min'] = -2 ** 15
-            channel['digital_max'] = 2 ** 15
+            channel['digital_max'] = 2 ** 15 - 1
             channel['transducer'] = ''
             channel['prefilter'] = ''
             edf.add_channel(channel)
@@ -483,6 +962,95 @@ class GEDecode:
         return [filename]
 
 
+    #----------------------------------------------------------------------
+    def stream_edf(self, filename, waveforms=None, edf_header=None, backlog=10):
+        """Write the waveforms into an EDF+ file as they are decoded.
+
+        The file is opened with the first waveform block, each data record of
+        one second is written when all the waveforms have their samples. The
+        original signed 16 bits samples are written, like `save_as_edf`. The
+        writing is stopped with `remove_listener(edf.listener)` and
+        `edf.close()`.
+
+        Parameters
+        ----------
+        filename : str
+            Absolute or realtive path for EDF+ file.
+        waveforms : list, optional
+            Waveforms to write, by default `FILTER_WAVEFORMS`.
+        edf_header: dict, optional
+            Declare the EDF+ patient header, by default the one defined with
+            `set_edf_header`.
+        backlog : int, 10
+            Seconds buffered for a waveform while others are missing, then
+            the missing ones are completed with zeros.
+
+        Returns
+        -------
+        EDF
+            The streaming EDF+ file, annotations can be written with
+            `write_annotation`.
+        """
+
+        if waveforms is None:
+            waveforms = self.FILTER_WAVEFORMS
+
+        if not waveforms:
+            raise Exception('The waveforms must be defined for streaming')
+
+        edf_header = dict(edf_header or self.edf_header or {})
+
+        if edf_header.get('birthdate', None):
+            edf_header['birthdate'] = datetime.fromtimestamp(edf_header.get('birthdate', 0))
+        else:
+            edf_header['birthdate'] = date(1900, 1, 1)
+
+        if not '.edf' in filename:
+            filename = filename + '.edf'
+
+        edf = EDF(filename)
+        edf.set_header(**edf_header)
+
+        for name in waveforms:
+            channel = EDFChannel(None)
+            channel['label'] = name
+            channel['dimension'] = WAVEFORMS_DICT[name]['unit']
+            channel['sample_rate'] = WAVEFORMS_DICT[name]['samps']
+
+            # The physical range must be known before the data, it is the
+            # digital one scaled like `save_as_edf`, the blocks use the same
+            # shift of `WaveformCatalog`
+            shift = WAVEFORMS_DICT[name].get('shift', 1)
+            if not isinstance(shift, (int, float)):
+                shift = 1
+
+            channel['physical_min'] = -2 ** 15 * shift
+            channel['physical_max'] = (2 ** 15 - 1) * shift
+            channel['digital_min'] = -2 ** 15
+            channel['digital_max'] = 2 ** 15 - 1
+            channel['transducer'] = WAVEFORMS_DICT[name]['transducer']
+            channel['prefilter'] = WAVEFORMS_DICT[name]['prefilter']
+            edf.add_channel(channel)
+
+        #----------------------------------------------------------------------
+        def listener(record):
+            if not isinstance(record, WaveBlock) or not record.name in waveforms:
+                return
+
+            if edf.writer is None:
+                edf.header.update({'startdate': datetime(1970, 1, 1) + timedelta(seconds=record.time)})
+                edf.open(digital=True, backlog=backlog)
+
+            # Original samples, the special values are replaced by 0
+            samples = np.asarray(record.samples, dtype=np.int16)
+            edf.write(record.name, np.where(samples < CONST.DATA_INVALID_LIMIT, 0, samples))
+
+        edf.listener = listener
+        self.add_listener(listener)
+
+        return edf
+
+
 
 
 
@@ -558,12 +1126,12 @@ class GEDecode:
         Returns
         -------
         list
-            Full sized DatexHeaderResponse.
+            Full sized raw DatexHeaderResponse, as bytes.
         """
 
         data_list = []
         for header in self.frame_list:
-            data = header[:-1] + [0]*(DatexHeaderResponse.LENGTH - len(header)) + [header[-1]]
+            data = bytes(header[:-1]) + bytes(DatexHeaderResponse.LENGTH - len(header)) + bytes(header[-1:])
             data_list.append(data)
 
         return data_list
@@ -579,6 +1147,8 @@ class GEDecode:
            List of raw headers.
         """
 
+        catalog = WaveformCatalog.compile(self.FILTER_WAVEFORMS)
+
         for record in map(DatexHeaderResponse, record_list):
 
             if record['r_maintype'] != CONST.DRI_MT_WAVE:
@@ -588,8 +1158,8 @@ class GEDecode:
             srtypeArray = [record['sr_type1'], record['sr_type2'], record['sr_type3'], record['sr_type4'], record['sr_type5'], record['sr_type6'], record['sr_type7'], record['sr_type8']]
 
             unixtime = record['r_time']
-            date_ = datetime(1970, 1, 1, 0, 0, 0, 0) + timedelta(seconds=unixtime)
 
+            data = None
 
             for i, srtype, offset in zip(range(8), srtypeArray, sroffArray):
                 if srtype == CONST.DRI_EOL_SUBR_LIST:
@@ -602,54 +1172,33 @@ class GEDecode:
 
                     # When just one waveform is requested.
                     if nextoffset == 0:
-                        nextoffset = WAVEFORMS_DICT[{d[1]:d[0] for d in CONST.DRI_WAVEFORM.items()}[srtype]]['samps'] * 2
-                        nextoffset = nextoffset + offset + 6
-
-
-                buffer = record['-data,'][6+offset : nextoffset]
-
+                        nextoffset = catalog.length[srtype] + offset + 6
 
-                for k, m in CONST.DRI_WAVEFORM.items():
-                    if m == srtype:
+                # Unrequested waveforms are skipped before any slicing
+                if catalog.requested[srtype]:
 
-                        if self.FILTER_WAVEFORMS and not k in self.FILTER_WAVEFORMS:
-                            continue
-
-                        # if not k in self.FILTER_WAVEFORMS:
-                            # continue
+                    if data is None:
+                        data = record.raw('data')
 
-                        values = self.read_shorts(buffer[:])
+                    buffer = data[6+offset : nextoffset]
 
+                    k = catalog.names[srtype]
+                    values = np.frombuffer(buffer[:len(buffer) // 2 * 2], dtype='<i2')
 
-                        # NO shifting
-                        if not False in (np.array(values) > CONST.DATA_INVALID):
-                            values = [v*WAVEFORMS_DICT[k].get('shift', 1) for v in values]
-                            # values = [v*WAVEFORMS_DICT[k].get('shift_', 1) for v in values]
+                    # The special values are masked sample by sample when scaled
+                    shift = catalog.shifts[srtype]
 
-                        dates = [date_] * len(values)
-
-                        # update DATA_WAVE_SUBRECORD
-                        if not k in self.DATA_WAVE:
-                            self.DATA_WAVE[k] = DataFrame({'datetime': dates, 'values': values,})
-                        else:
-                            self.DATA_WAVE[k] = self.DATA_WAVE[k].append(DataFrame({'datetime': dates, 'values': values,}), ignore_index=True, sort=True)
+                    # update DATA_WAVE and __DATA_WAVE__
+                    if self.STORE:
+                        self.STORE_WAVE.append(k, unixtime, values, shift)
 
-                        # update __DATA_WAVE_SUBRECORD__
-                        if not k in self.__DATA_WAVE__:
-                            self.__DATA_WAVE__[k] = DataFrame({'datetime': dates, 'values': values,})
-                        else:
-                            self.__DATA_WAVE__[k] = self.__DATA_WAVE__[k].append(DataFrame({'datetime': dates, 'values': values,}), ignore_index=True, sort=True)
+                    if self.LISTENERS:
+                        self.__emit__(WaveBlock(CONST.DRI_MT_WAVE, unixtime, k, values, shift))
 
 
                 if nextoffset <= offset or nextoffset > 1450:
                     break
 
-        if not ignore_missging:
-            for f in self.DATA_WAVE:
-                if f not in self.__DATA_WAVE__:
-                    self.DATA_WAVE[f](DataFrame({'datetime': dates[0], 'values': CONST.DATA_INVALID,}))
-                    self.__DATA_WAVE__[f](DataFrame({'datetime': dates[0], 'values': CONST.DATA_INVALID,}))
-
 
     #----------------------------------------------------------------------
     def read_shorts(self, buffer):
@@ -675,6 +1224,8 @@ class GEDecode:
            Raw DatexHeaderResponse.
         """
 
+        plan = SubrecordPlan.compile(self.FILTER_SUBRECORDS)
+
         for record in map(DatexHeaderResponse, record_list):
 
             if record['r_maintype'] != CONST.DRI_MT_PHDB:
@@ -688,50 +1239,262 @@ class GEDecode:
             date_ = datetime(1970, 1, 1, 0, 0, 0, 0) + timedelta(seconds=unixtime)
 
 
-            #----------------------------------------------------------------------
-
-            # phdata_ptr = PhysiologicalData()
-            # phdata_ptr.load(record['-data,'])
-
-            #----------------------------------------------------------------------
-
-            phdata_ptr = PhysiologicalData()
             for i, srtype, offset in zip(range(8), srtypeArray, sroffArray):
                 if srtype == CONST.DRI_EOL_SUBR_LIST:
                     break
 
-                buffer = record['-data,'][4+offset:4+offset + 270]
-
-                if i == 0:
-                    phdata_ptr.DATA['basic'] = HeaderHandler(data=buffer, init=phdata_ptr['basic'], size=270).DATA
-                elif i== 1:
-                    phdata_ptr.DATA['ext1'] = HeaderHandler(data=buffer, init=phdata_ptr['ext1'], size=270).DATA
-                elif i == 2:
-                    phdata_ptr.DATA['ext2'] = HeaderHandler(data=buffer, init=phdata_ptr['ext2'], size=270).DATA
-                elif i == 3:
-                    phdata_ptr.DATA['ext3'] = HeaderHandler(data=buffer, init=phdata_ptr['ext3'], size=270).DATA
+                # Raw record for the extraction plan and the status of the modules
+                if i < 4:
+                    buffer = record.raw('data')[4+offset:4+offset + 270]
+                    self.IMAGE[4 + 270*i:4 + 270*i + len(buffer)] = buffer
 
             #----------------------------------------------------------------------
 
-            subrecord = FormatSubrecord(date_, phdata_ptr)  #.format()
-            self.MODULES, self.MODULES_ACTIVE, self.MEANSURES_AVAILABLE = subrecord.module_status()
+            key = self.STATUS.key(self.IMAGE)
+            if key != self.STATUS_KEY:
+                self.STATUS_KEY = key
+                status = [list(_) for _ in self.STATUS.status(self.IMAGE, date_, key)]
 
-            df = subrecord.format(self.MODULES_ACTIVE, self.FILTER_SUBRECORDS)
+                if status != [self.MODULES, self.MODULES_ACTIVE, self.MEANSURES_AVAILABLE]:
+                    self.MODULES, self.MODULES_ACTIVE, self.MEANSURES_AVAILABLE = status
+                    self.on_module_change(date_)
 
+            row = plan.row(self.IMAGE, date_)
 
-            # DATA_SUBRECORD update
-            if not df is None:
-                if self.DATA_SUBRECORD.empty:
-                    self.DATA_SUBRECORD = df.copy()
-                else:
-                    self.DATA_SUBRECORD = self.DATA_SUBRECORD.append(df.copy(), ignore_index=True, sort=True)
+            # DATA_SUBRECORD and __DATA_SUBRECORD__ update
+            if self.STORE:
+                self.STORE_SUBRECORD.append(row)
 
-            # __DATA_SUBRECORD__ update
-            if not df is None:
-                if self.__DATA_SUBRECORD__.empty:
-                    self.__DATA_SUBRECORD__ = df.copy()
-                else:
-                    self.__DATA_SUBRECORD__ = self.__DATA_SUBRECORD__.append(df.copy(), ignore_index=True, sort=True)
+            if row and self.LISTENERS:
+                values = {label: value for label, value in row.items() if label != 'datetime'}
+                self.__emit__(DisplayRecord(CONST.DRI_MT_PHDB, unixtime, row['datetime'], values))
+
+
+    #----------------------------------------------------------------------
+    def read_phdb(self, record_list):
+        """Decode the physiological data records into a NumPy record array.
+
+        The subrecords of each record are placed in the `basic`, `ext1`,
+        `ext2` and `ext3` classes like in `read_subrecords`, then all the
+        records are decoded with a single `np.frombuffer`. Missing classes are
+        filled with zeros.
+
+        Parameters
+        ----------
+        record_list: array
+           Raw DatexHeaderResponse.
+
+        Returns
+        -------
+        numpy.recarray
+            A record for each physiological data record, with dtype
+            `PhysiologicalData.DTYPE`.
+        """
+
+        size = PhysiologicalData.LENGTH
+        class_size = PhysiologicalData.SUBCLASS_DTYPE['basic'].itemsize
+        buffer = bytearray()
+
+        for record in map(DatexHeaderResponse, record_list):
+
+            if record['r_maintype'] != CONST.DRI_MT_PHDB:
+                continue
+
+            data = record.raw('data')
+            phdb = bytearray(size)
+
+            for i in range(len(PHDB_SUBCLASSES)):
+                srtype = record['sr_type{}'.format(i + 1)]
+                offset = record['sr_offset{}'.format(i + 1)]
+
+                if srtype == CONST.DRI_EOL_SUBR_LIST:
+                    break
+
+                if i == 0:
+                    time_ = data[offset:offset + 4]
+                    phdb[:len(time_)] = time_
+                    tail = data[offset + 4 + class_size:offset + 8 + class_size]
+                    phdb[size - 4:size - 4 + len(tail)] = tail
+
+                block = data[4 + offset:4 + offset + class_size]
+                start = 4 + i * class_size
+                phdb[start:start + len(block)] = block
+
+            buffer.extend(phdb)
+
+        return PhysiologicalData.frombuffer(bytes(buffer))
+
+
+    #----------------------------------------------------------------------
+    @classmethod
+    def read_phdb_raw(cls, data):
+        """Decode all the physiological data records from a raw capture.
+
+        Parameters
+        ----------
+        data: bytes
+           Raw data, as stored by `save_as_raw`.
+
+        Returns
+        -------
+        numpy.recarray
+            A record for each physiological data record.
+        """
+
+        decoder = cls([])
+        decoder.frame_list = Deframer().feed(data)
+
+        return decoder.read_phdb(decoder.__create_recordlist__())
+
+
+
+#----------------------------------------------------------------------
+def iter_records(source, window=2**16, **kwargs):
+    """Decode a source of raw data without retain the decoded data.
+
+    Each waveform block and display subrecord is yielded once, the memory used
+    is constant so unbounded streams can be piped through.
+
+    Parameters
+    ----------
+    source: bytes, str, file object, iterable, GEDevice
+       Raw data, filename, binary file (like `sys.stdin.buffer`), iterable of
+       chunks or a collecting `GEDevice` (its consumed bytes are released).
+    window: int, 2**16
+       Bytes read and decoded each time.
+    kwargs: dict
+       Arguments for `GEDecode`.
+
+    Yields
+    ------
+    WaveBlock, DisplayRecord
+        Decoded waveform blocks and display subrecords.
+    """
+
+    records = deque()
+
+    # Collecting device
+    if hasattr(source, 'BUFFER') and hasattr(source, 'NOTIFIER'):
+
+        if asyncio.iscoroutinefunction(source.NOTIFIER.wait):
+            raise Exception('Asynchronous devices must use `GEDecode.stream`')
+
+        decoder = GEDecode([], release=True, store=False, **kwargs)
+        decoder.add_listener(records.append)
+        decoder.BUFFER = source.BUFFER
+
+        while True:
+            reading = source.READING
+            source.NOTIFIER.wait(timeout=1)
+            source.NOTIFIER.consume()
+            decoder.__processing__()
+
+            while records:
+                yield records.popleft()
+
+            if not reading:
+                return
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        chunks = (view[i:i + window] for i in range(0, len(view), window))
+
+    elif isinstance(source, (str, os.PathLike)):
+        file = open(source, 'rb')
+        chunks = iter(partial(file.read, window), b'')
+
+    elif hasattr(source, 'read'):
+        chunks = iter(partial(getattr(source, 'read1', source.read), window), b'')
+
+    else:
+        chunks = iter(source)
+
+    buffer = bytearray()
+    decoder = GEDecode(buffer, release=True, store=False, **kwargs)
+    decoder.add_listener(records.append)
+
+    try:
+        for chunk in chunks:
+            buffer.extend(chunk)
+            decoder.__processing__()
+
+            while records:
+                yield records.popleft()
+
+    finally:
+        if isinstance(source, (str, os.PathLike)):
+            file.close()
+
+
+
+########################################################################
+class WaveformCatalog:
+    """Waveform types indexed by their id.
+
+    The names, lengths and scales of `CONST.DRI_WAVEFORM` and
+    `WAVEFORMS_DICT` are placed in lists indexed by the subrecord type, so
+    each waveform subrecord is dispatched without searching the dictionaries.
+    """
+
+    CATALOGS = {}
+    SIZE = 256  # Subrecord types are single bytes
+    WIDTH = 2  # Bytes for each sample
+
+    #----------------------------------------------------------------------
+    def __init__(self, filters=None):
+        """
+        Parameters
+        ----------
+        filters: array, optional
+           List of desired waveforms, if empty then all the waveforms are
+           requested.
+        """
+
+        self.names = [None] * self.SIZE
+        self.samples = [0] * self.SIZE
+        self.length = [1450] * self.SIZE
+        self.shifts = [None] * self.SIZE
+        self.requested = [False] * self.SIZE
+
+        for name, type_ in CONST.DRI_WAVEFORM.items():
+            waveform = WAVEFORMS_DICT.get(name, {})
+
+            self.names[type_] = name
+            self.requested[type_] = not filters or name in filters
+
+            # Samples in a second, unknown waveforms (without `samps` or with
+            # '?') fill the record
+            if isinstance(waveform.get('samps', None), int) and waveform['samps']:
+                self.samples[type_] = waveform['samps']
+                self.length[type_] = waveform['samps'] * self.WIDTH
+
+            shift = waveform.get('shift', 1)
+            if isinstance(shift, (int, float)):
+                self.shifts[type_] = shift
+
+
+    #----------------------------------------------------------------------
+    @classmethod
+    def compile(cls, filters=None):
+        """Return the catalog for a set of filters, it is built only once.
+
+        Parameters
+        ----------
+        filters: array, optional
+           List of desired waveforms.
+
+        Returns
+        -------
+        WaveformCatalog
+            Catalog for the filters.
+        """
+
+        key = frozenset(filters or [])
+
+        if not key in cls.CATALOGS:
+            cls.CATALOGS[key] = cls(filters)
+
+        return cls.CATALOGS[key]
 
 
 
@@ -739,6 +1502,54 @@ class GEDecode:
 class FormatSubrecord:
     """Parse raw data into Pandas DataFrames."""
 
+    # Groups to parse, the indexed groups include the replacement for the key
+    MEASURES = [
+
+        # Basic
+        ('INV-BP', ['p_group', 'p1']),
+        ('INV-BP', ['p_group', 'p2']),
+        ('INV-BP', ['p_group', 'p3']),
+        ('INV-BP', ['p_group', 'p4']),
+        ('INV-BP', ['p_group', 'p5']),
+        ('INV-BP', ['p_group', 'p6']),
+        ('TEMP', ['t_group', 't1']),
+        ('TEMP', ['t_group', 't2']),
+        ('TEMP', ['t_group', 't3']),
+        ('TEMP', ['t_group', 't4']),
+        'ECG',
+        'NIBP',
+        'SpO2',
+        'CO2',
+        'O2',
+        'N2O',
+        'AA',
+        'FLOW-VOL',
+        'CO-WEDGE',
+        'NMT',
+        'ECG-EXTRA',
+        'SvO2',
+
+        #Ext1
+        'ECG-ARRH',
+        'ECG-12',
+
+        #Ext2
+        'NMT2',
+        'EEG',
+        'EEG-BIS',
+        'ENTROPY',
+        'EEG2',
+
+        # Ext3
+        'GASEX',
+        'FLOW-VOL2',
+        'BAL-GAS',
+        'TONO',
+        'AA2',
+
+    ]
+
+
     #----------------------------------------------------------------------
     def __init__(self, date_, header):
         """
@@ -750,55 +1561,9 @@ class FormatSubrecord:
         header : PhysiologicalData object
             Header with raw data.
         """
-        self.data = {}
         self.date = date_
         self.header = header
-
-        self.data = [
-
-            # Basic
-            ('INV-BP', ['p_group', 'p1']),
-            ('INV-BP', ['p_group', 'p2']),
-            ('INV-BP', ['p_group', 'p3']),
-            ('INV-BP', ['p_group', 'p4']),
-            ('INV-BP', ['p_group', 'p5']),
-            ('INV-BP', ['p_group', 'p6']),
-            ('TEMP', ['t_group', 't1']),
-            ('TEMP', ['t_group', 't2']),
-            ('TEMP', ['t_group', 't3']),
-            ('TEMP', ['t_group', 't4']),
-            'ECG',
-            'NIBP',
-            'SpO2',
-            'CO2',
-            'O2',
-            'N2O',
-            'AA',
-            'FLOW-VOL',
-            'CO-WEDGE',
-            'NMT',
-            'ECG-EXTRA',
-            'SvO2',
-
-            #Ext1
-            'ECG-ARRH',
-            'ECG-12',
-
-            #Ext2
-            'NMT2',
-            'EEG',
-            'EEG-BIS',
-            'ENTROPY',
-            'EEG2',
-
-            # Ext3
-            'GASEX',
-            'FLOW-VOL2',
-            'BAL-GAS',
-            'TONO',
-            'AA2',
-
-        ]
+        self.data = self.MEASURES
 
 
     #----------------------------------------------------------------------
@@ -890,6 +1655,33 @@ class FormatSubrecord:
             DataFrame with single row that contains all measures with label
             as headers.
 
+        """
+
+        formated = self.row(active, filters)
+
+        if formated:
+            formated = {k: [v] for k, v in formated.items()}
+
+        return DataFrame(formated)
+
+
+    #----------------------------------------------------------------------
+    def row(self, active, filters=None):
+        """Process a subrecord (their raw header), aply shifts and get references.
+
+        Parameters
+        ----------
+        active : array
+            List of groups to parse.
+        filters: array, optional
+            A sub list of desired subrecords.
+
+        Returns
+        -------
+        dict
+            Labels as keys with the measures, and the `datetime` of the
+            record. Empty if no measure was parsed.
+
         """
         # if not active:
             # return
@@ -964,12 +1756,12 @@ class FormatSubrecord:
                         # value = self.header[key]
 
 
-                formated[name] = [value]
+                formated[name] = value
 
         if formated:
             formated['datetime'] = self.date
 
-        return DataFrame(formated)
+        return formated
 
 
 
@@ -1034,8 +1826,378 @@ class FormatSubrecord:
             e = mod_exist['key']
             a = mod_activ['key']
 
-        exist = self.header['{}:{}'.format(mod_exist['subclass'], e)] == 'True'
-        activ = self.header['{}:{}'.format(mod_activ['subclass'], a)] == 'True'
+        e, e_bit = e.rsplit(':', 1)
+        a, a_bit = a.rsplit(':', 1)
+
+        exist = self.header.bit('{}:{}'.format(mod_exist['subclass'], e), int(e_bit))
+        activ = self.header.bit('{}:{}'.format(mod_activ['subclass'], a), int(a_bit))
 
         return exist, activ
 
+
+
+
+########################################################################
+class RecordFields:
+    """Fields of the raw physiological record read with a precompiled struct.
+
+    The keys are located in `PhysiologicalData.DTYPE` and all the fields are
+    unpacked at once, as unsigned little-endian integers.
+    """
+
+    FORMATS = {1: 'B', 2: 'H', 4: 'I'}
+
+    #----------------------------------------------------------------------
+    def __locate__(self, path):
+        """Offset, size and kind of access of a key in the record.
+
+        Parameters
+        ----------
+        path: list
+            Splitted key, the last element could be a bit or a range of bits.
+
+        Returns
+        -------
+        tuple
+            Offset, size in bytes, kind (`bit`, `range`, `short` or `integer`)
+            and the argument for the kind.
+        """
+
+        access = path[-1]
+        if access.isdigit() or access.replace('-', '0').isdigit():
+            path = path[:-1]
+
+        dtype = PhysiologicalData.DTYPE
+        offset = 0
+        for element in path:
+            dtype, position = dtype.fields[element][:2]
+            offset += position
+        width = dtype.itemsize
+
+        if access.isdigit():
+            return offset, width, 'bit', int(access)
+
+        elif access.replace('-', '0').isdigit():
+            low, high = [int(_) for _ in access.split('-')]
+            return offset, width, 'range', (8 * width - 1 - high, (1 << (high - low + 1)) - 1)
+
+        elif width == 2:
+            return offset, width, 'short', None
+
+        return offset, width, 'integer', None
+
+
+    #----------------------------------------------------------------------
+    def __compile__(self, fields):
+        """Build the struct that reads all the fields at once.
+
+        Parameters
+        ----------
+        fields: list
+            Offset and size of each field, in the order of the entries.
+        """
+
+        order = sorted(range(len(fields)), key=lambda i: fields[i])
+
+        format_ = '<'
+        position = 0
+        self.overlapped = False
+        for i in order:
+            offset, width = fields[i]
+            if offset < position:
+                self.overlapped = True
+                break
+            format_ += '{}x'.format(offset - position) if offset > position else ''
+            format_ += self.FORMATS.get(width, '{}s'.format(width))
+            position = offset + width
+
+        self.fields = fields
+        self.order = order
+        self.struct = None if self.overlapped else struct.Struct(format_)
+
+        # Fields without a native struct format are read as bytes
+        self.wide = [order.index(i) for i, (_, width) in enumerate(fields) if not width in self.FORMATS]
+
+
+    #----------------------------------------------------------------------
+    def values(self, image):
+        """Read the unsigned little-endian value of each field.
+
+        Parameters
+        ----------
+        image: bytes
+            Raw record of `PhysiologicalData.LENGTH` bytes.
+
+        Returns
+        -------
+        list
+            Values in the order of the fields.
+        """
+
+        if self.overlapped:
+            return [int.from_bytes(image[offset:offset + width], 'little') for offset, width in self.fields]
+
+        unpacked = list(self.struct.unpack_from(image))
+        for i in self.wide:
+            unpacked[i] = int.from_bytes(unpacked[i], 'little')
+
+        values = [None] * len(unpacked)
+        for position, i in enumerate(self.order):
+            values[i] = unpacked[position]
+
+        return values
+
+
+
+########################################################################
+class SubrecordPlan(RecordFields):
+    """Flat extraction plan for the display subrecords.
+
+    The groups of `FormatSubrecord.MEASURES` are compiled once for each set of
+    filters into a list of entries (field, kind, shift, dictionary, column),
+    the fields are read from the raw record with a single precompiled struct.
+    The result of `row` is the same of `FormatSubrecord.row`.
+    """
+
+    PLANS = {}
+
+    #----------------------------------------------------------------------
+    def __init__(self, filters=None):
+        """
+        Parameters
+        ----------
+        filters: array, optional
+            A sub list of desired subrecords.
+        """
+
+        fields = []
+        self.entries = []
+
+        for measure in FormatSubrecord.MEASURES:
+
+            if isinstance(measure, tuple):
+                measure, replace = measure
+            else:
+                replace = ['', '']
+
+            for component in GROUPS_DICT[measure]:
+                label = component['label']
+
+                if label.endswith(': ACT') or label.endswith(': MOD'):
+                    continue
+
+                if replace[1]:
+                    name = '{} ({})'.format(label.strip(), replace[1])
+                else:
+                    name = label.strip()
+
+                if filters and not (name in filters):
+                    continue
+
+                path = [component['subclass']] + component['key'].replace(*replace).split(':')
+                offset, width, kind, argument = self.__locate__(path)
+
+                if not (offset, width) in fields:
+                    fields.append((offset, width))
+
+                self.entries.append((name, fields.index((offset, width)), kind, argument, component.get('shift', 1), component.get('dict', None)))
+
+        self.__compile__(fields)
+
+
+    #----------------------------------------------------------------------
+    @classmethod
+    def compile(cls, filters=None):
+        """Return the plan for a set of filters, it is compiled only once.
+
+        Parameters
+        ----------
+        filters: array, optional
+            A sub list of desired subrecords.
+
+        Returns
+        -------
+        SubrecordPlan
+            Plan for the filters.
+        """
+
+        key = frozenset(filters or [])
+
+        if not key in cls.PLANS:
+            cls.PLANS[key] = cls(filters)
+
+        return cls.PLANS[key]
+
+
+    #----------------------------------------------------------------------
+    def row(self, image, date_):
+        """Process a raw record, aply shifts and get references.
+
+        Parameters
+        ----------
+        image: bytes
+            Raw record of `PhysiologicalData.LENGTH` bytes.
+        date_ : Datetime object
+            Datetime of the record.
+
+        Returns
+        -------
+        dict
+            Labels as keys with the measures, and the `datetime` of the
+            record. Empty if no measure was parsed.
+        """
+
+        values = self.values(image)
+        formated = {}
+
+        for name, index, kind, argument, shift, dict_ in self.entries:
+            value = values[index]
+
+            if kind == 'bit':
+                value = (value >> argument) & 1
+                if dict_ is not None:
+                    value = dict_[value]
+                else:
+                    value = str(bool(value))
+
+            elif kind == 'range':
+                value = (value >> argument[0]) & argument[1]
+                if dict_ is not None:
+                    value = dict_.get(value, None)
+                elif value > CONST.DATA_INVALID:
+                    value = value * shift
+
+            elif dict_ is not None:
+                value = dict_.get(value, None)
+
+            else:
+                if kind == 'short':
+                    value = value - 0x10000 if value & 0x8000 else value
+                    if value <= CONST.DATA_OVER_RANGE:
+                        value = None
+
+                if value and value > CONST.DATA_INVALID:
+                    value = value * shift
+
+            formated[name] = value
+
+        if formated:
+            formated['datetime'] = date_
+
+        return formated
+
+
+
+########################################################################
+class ModuleStatus(RecordFields):
+    """Memoized `FormatSubrecord.module_status`.
+
+    The status of the modules only depends on the MOD and ACT bits of each
+    group and on the fields that format some labels. Those values are read
+    from the raw record with a precompiled struct and used as the key of the
+    cache, so the status is computed only when they change.
+    """
+
+    CACHE_SIZE = 2**8
+
+    #----------------------------------------------------------------------
+    def __init__(self):
+        """"""
+
+        paths = []
+
+        for measure in FormatSubrecord.MEASURES:
+
+            if isinstance(measure, tuple):
+                measure, replace = measure
+            else:
+                replace = ['', '']
+
+            for suffix in ('MOD', 'ACT'):
+                field = LABEL_TO_DICT['{}: {}'.format(measure, suffix)]
+                key = field['key'].replace(*replace) if replace[0] else field['key']
+                paths.append([field['subclass']] + key.split(':'))
+
+            for g in GROUPS_DICT[measure]:
+                if 'label_format' in g:
+                    field = LABEL_TO_DICT[g['label_format'][1]]
+                    paths.append([field['subclass']] + field['key'].split(':'))
+
+        fields = []
+        self.entries = []
+
+        for path in paths:
+            offset, width, kind, argument = self.__locate__(path)
+
+            if not (offset, width) in fields:
+                fields.append((offset, width))
+
+            self.entries.append((fields.index((offset, width)), kind, argument))
+
+        self.__compile__(fields)
+        self.cache = {}
+
+
+    #----------------------------------------------------------------------
+    def key(self, image):
+        """Values of the status bits and label fields.
+
+        Parameters
+        ----------
+        image: bytes
+            Raw record of `PhysiologicalData.LENGTH` bytes.
+
+        Returns
+        -------
+        tuple
+            Hashable key of the status of the modules.
+        """
+
+        values = self.values(image)
+        key = []
+
+        for index, kind, argument in self.entries:
+            value = values[index]
+
+            if kind == 'bit':
+                value = (value >> argument) & 1
+            elif kind == 'range':
+                value = (value >> argument[0]) & argument[1]
+
+            key.append(value)
+
+        return tuple(key)
+
+
+    #----------------------------------------------------------------------
+    def status(self, image, date_=None, key=None):
+        """Return the list of present and active modules.
+
+        Parameters
+        ----------
+        image: bytes
+            Raw record of `PhysiologicalData.LENGTH` bytes.
+        date_ : Datetime object, optional
+            Datetime of the record.
+        key: tuple, optional
+            Result of `key` for `image`, if is already computed.
+
+        Returns
+        -------
+        tuple
+            The same lists of `FormatSubrecord.module_status`, must not be
+            modified.
+        """
+
+        if key is None:
+            key = self.key(image)
+
+        if not key in self.cache:
+            if len(self.cache) >= self.CACHE_SIZE:
+                self.cache.clear()
+
+            header = PhysiologicalData(data=bytes(image))
+            self.cache[key] = FormatSubrecord(date_, header).module_status()
+
+        return self.cache[key]
+
@@ -0,0 +1,228 @@
+"""
+========
+Deframer
+========
+
+Vectorized alternative to the byte-at-a-time frame search of `GEDecode`.
+
+The raw stream is processed one chunk at a time, the `FRAMECHAR` delimiters
+are located with array operations, the `CTRLCHAR`/`BIT5` escaping is undone
+with masks and the checksums are validated in bulk. The resulting frame list
+is exactly the same that the state machine in `GEDecode` generates.
+
+.. code:: ipython3
+
+    deframer = Deframer()
+    frames = deframer.feed(data)
+
+The state can be advanced without decoding, for example to split a capture:
+
+.. code:: ipython3
+
+    deframer.skip(data)
+
+"""
+
+import numpy as np
+
+from .dataconstants import CONST
+
+
+########################################################################
+class Deframer:
+    """Search for complete and validated frames in chunks of raw data.
+
+    The state between chunks (partial frame, escaping and storing flags) is
+    preserved, so the input stream can be splitted at any point.
+    """
+
+    #----------------------------------------------------------------------
+    def __init__(self, storing=False, bitshift=False):
+        """
+        Parameters
+        ----------
+        storing : bool, optional
+            Initial state, the last FRAMECHAR started a frame.
+        bitshift : bool, optional
+            Initial state, the next byte is escaped.
+        """
+
+        # Raw bytes after the last FRAMECHAR, only kept while storing.
+        self.carry = np.empty(0, dtype=np.uint8)
+
+        # Equivalent to `m_storestart` after the last FRAMECHAR.
+        self.storing = storing
+
+        # Equivalent to `m_bitshiftnext`.
+        self.bitshift = bitshift
+
+
+    #----------------------------------------------------------------------
+    def reset(self):
+        """Discard the partial frame and restart the search."""
+
+        self.__init__()
+
+
+    #----------------------------------------------------------------------
+    def feed(self, chunk):
+        """Process a new chunk of raw data.
+
+        Parameters
+        ----------
+        chunk : bytes, bytearray, memoryview, array
+            New raw data, could be a list of integers too.
+
+        Returns
+        -------
+        list
+            List of validated frames, each one as a list of integers with the
+            checksum as last element.
+        """
+
+        data = self.__asarray__(chunk)
+
+        if self.carry.size:
+            data = np.concatenate((self.carry, data))
+
+        framechars = np.flatnonzero(data == CONST.FRAMECHAR)
+
+        if not framechars.size:
+            if self.storing:
+                self.carry = data.copy()
+            return []
+
+        ctrl = data == CONST.CTRLCHAR
+        keep = ~(ctrl | (data == CONST.FRAMECHAR))
+
+        # Undo the escaping: every byte preceded by a CTRLCHAR gets the BIT5.
+        unescaped = data.copy()
+        shifted = np.flatnonzero(keep[1:] & ctrl[:-1]) + 1
+        unescaped[shifted] |= CONST.BIT5
+
+        compact = unescaped[keep]
+        position = np.zeros(data.size + 1, dtype=np.int64)
+        np.cumsum(keep, out=position[1:])
+
+        starts = []
+        ends = []
+        begin = 0
+
+        for end in framechars.tolist():
+
+            if self.storing:
+                pa = position[begin]
+                pb = position[end]
+
+                if end > begin:
+                    # The escape flag is carried over FRAMECHAR delimiters.
+                    if self.bitshift and not ctrl[begin]:
+                        compact[pa] |= CONST.BIT5
+                    self.bitshift = bool(ctrl[end - 1])
+
+                if pb > pa:
+                    starts.append(pa)
+                    ends.append(pb)
+                    self.storing = False
+
+            else:
+                self.storing = True
+
+            begin = end + 1
+
+        if self.storing:
+            self.carry = data[begin:].copy()
+        else:
+            self.carry = np.empty(0, dtype=np.uint8)
+
+        if not starts:
+            return []
+
+        # Bulk checksum validation with segment sums.
+        starts = np.array(starts, dtype=np.int64)
+        ends = np.array(ends, dtype=np.int64)
+
+        cumsum = np.zeros(compact.size + 1, dtype=np.int64)
+        np.cumsum(compact, out=cumsum[1:])
+
+        checksum = (cumsum[ends - 1] - cumsum[starts]) & 0xff
+        valid = checksum == compact[ends - 1]
+
+        return [compact[a:b].tolist() for a, b in zip(starts[valid], ends[valid])]
+
+
+    #----------------------------------------------------------------------
+    def skip(self, chunk):
+        """Advance the state over a chunk without extract the frames.
+
+        Only the delimiters are inspected, so the state at any point of a
+        capture can be known with a fraction of the cost of `feed`.
+
+        Parameters
+        ----------
+        chunk : bytes, bytearray, memoryview, array
+            New raw data.
+        """
+
+        data = self.__asarray__(chunk)
+
+        if self.carry.size:
+            data = np.concatenate((self.carry, data))
+
+        framechars = np.flatnonzero(data == CONST.FRAMECHAR)
+
+        if not framechars.size:
+            if self.storing:
+                self.carry = data.copy()
+            return
+
+        ctrl = data == CONST.CTRLCHAR
+        kept = np.cumsum(~(ctrl | (data == CONST.FRAMECHAR)))
+
+        # For each delimiter: raw bytes, unescaped bytes and escape at the end
+        # of the segment that it closes.
+        begins = np.concatenate(([0], framechars[:-1] + 1))
+        raw = (framechars > begins).tolist()
+        stored = (kept[framechars] - np.concatenate(([0], kept[framechars[:-1]])) > 0).tolist()
+        escaped = ctrl[framechars - 1].tolist()
+
+        for raw_, stored_, escaped_ in zip(raw, stored, escaped):
+
+            if self.storing:
+                if raw_:
+                    self.bitshift = escaped_
+                if stored_:
+                    self.storing = False
+
+            else:
+                self.storing = True
+
+        if self.storing:
+            self.carry = data[framechars[-1] + 1:].copy()
+        else:
+            self.carry = np.empty(0, dtype=np.uint8)
+
+
+    #----------------------------------------------------------------------
+    def __asarray__(self, chunk):
+        """Convert the input chunk into an array of unsigned bytes.
+
+        Parameters
+        ----------
+        chunk : bytes, bytearray, memoryview, array
+            Raw data.
+
+        Returns
+        -------
+        ndarray
+            Array of `uint8`.
+        """
+
+        if isinstance(chunk, np.ndarray):
+            return chunk.astype(np.uint8, copy=False)
+
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            return np.frombuffer(chunk, dtype=np.uint8)
+
+        return np.array(chunk, dtype=np.uint8)
+
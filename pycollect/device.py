@@ -15,6 +15,32 @@ Connect and request Subrecord and Waveform:
     device.collect(True)
 
 
+The input buffer is a compact `bytearray`, a fixed capacity ring can be used
+for long sessions, `buffer='list'` keeps the legacy list of integers:
+
+.. code:: ipython3
+
+    device = GEDevice(buffer='ring', capacity=2**20, policy='spill', spill='session.raw')
+
+
+The received bytes can be saved as they arrive into rolling segment files,
+see `SegmentedCapture`:
+
+.. code:: ipython3
+
+    device = GEDevice(buffer='ring', capture='captures/case_0042')
+
+
+A raw file can be replayed, as fast as possible or paced with the time of the
+frames (`speed` multiplier):
+
+.. code:: ipython3
+
+    device = GEDevice(raw_file='db00.raw', pacing='realtime', speed=10, loop=False)
+    device.connect(None)
+    device.collect(True)
+
+
 To clear the buffer input:
 
 .. code:: ipython3
@@ -30,9 +56,14 @@ To stop the data collecting:
 
 """
 
-from struct import pack
+import time
+from struct import pack, unpack
 from threading import Thread
 
+import numpy as np
+
+from .buffer import RingBuffer, DataNotifier
+from .capture import SegmentedCapture
 from .dataconstants import CONST
 from .measures import WAVEFORMS_DICT
 from .headers import DatexHeaderRequest, DatexHeaderWaveRequest
@@ -41,20 +72,53 @@ import serial
 
 ########################################################################
 class FakeDevice:
-    """Debugger class for simulate the input data."""
+    """Debugger class for simulate the input data.
+
+    The raw file can be replayed one byte at time (legacy), as fast as
+    possible or paced with the `r_time` of the frames.
+    """
+
+    PACINGS = ['byte', 'fast', 'realtime']
 
     #----------------------------------------------------------------------
-    def __init__(self, raw_file):
+    def __init__(self, raw_file, pacing='byte', speed=1, loop=True):
         """Establish the connection and handle the data input from monitor.
 
         Parameters
         ----------
         raw_file : str, optional
             Input file with raw data.
+        pacing : str, 'byte'
+            `byte` for one byte each millisecond, `fast` for read up to `size`
+            bytes without delays or `realtime` for follow the `r_time` of the
+            frames.
+        speed : float, 1
+            Speed multiplier for the `realtime` pacing.
+        loop : bool, True
+            Replay the file in infinite loop, otherwise `eof` is set at the end.
         """
 
+        if not pacing in self.PACINGS:
+            raise Exception('Pacing {} is not available'.format(pacing))
+
         self.raw_file = raw_file
-        self.raw = self.__read_raw__()
+        self.PACING = pacing
+        self.SPEED = speed
+        self.LOOP = loop
+        self.eof = False
+
+        if pacing == 'byte':
+            self.raw = self.__read_raw__()
+        else:
+            with open(raw_file, 'rb') as file:
+                self.data = file.read()
+            self.position = 0
+
+            # The pacing clock starts with the first read
+            self.start = None
+
+        if pacing == 'realtime':
+            self.seconds, self.offsets = self.__time_index__()
 
         self.device = None
 
@@ -75,6 +139,63 @@ class FakeDevice:
             yield d
 
 
+    #----------------------------------------------------------------------
+    def __time_index__(self):
+        """Offset in the raw data where each second of `r_time` starts.
+
+        Returns
+        -------
+        tuple
+            Array of seconds and array with the offset for each one, the end of
+            the data is included as the last second.
+        """
+
+        data = np.frombuffer(self.data, dtype=np.uint8)
+        framechars = np.flatnonzero(data == CONST.FRAMECHAR)
+
+        starts = []
+        times = []
+        for begin, end in zip(framechars[:-1].tolist(), framechars[1:].tolist()):
+
+            # The header is escaped too, only the first bytes are required
+            segment = []
+            escaped = False
+            for byte in self.data[begin + 1:min(end, begin + 24)]:
+                if byte == CONST.CTRLCHAR:
+                    escaped = True
+                    continue
+                if escaped:
+                    byte |= CONST.BIT5
+                    escaped = False
+                segment.append(byte)
+
+            if len(segment) < 10:
+                continue
+
+            starts.append(begin)
+            times.append(unpack('<I', bytes(segment[6:10]))[0])
+
+        if not times:
+            return np.array([0., 1.]), np.array([0, len(self.data)])
+
+        times = np.maximum.accumulate(times)
+        seconds, index = np.unique(times, return_index=True)
+        offsets = np.array(starts)[index]
+        offsets[0] = 0
+
+        seconds = np.append(seconds, seconds[-1] + 1).astype(float)
+        offsets = np.append(offsets, len(self.data))
+
+        return seconds, offsets
+
+
+    #----------------------------------------------------------------------
+    def __rewind__(self):
+        """Restart the replay from the beginning of the file."""
+
+        self.position = 0
+        self.start = None
+
     #----------------------------------------------------------------------
     def connect(self, port, timeout):
         """Establish the connection and debug an unrelated serial device.
@@ -97,7 +218,7 @@ class FakeDevice:
 
     #----------------------------------------------------------------------
     def read(self, size):
-        """Return the input raw file one byte at time.
+        """Return the input raw file according to the pacing.
 
         Parameters
         ----------
@@ -106,24 +227,71 @@ class FakeDevice:
 
         Returns
         -------
-        list
+        list, bytes
             Array with raw data.
         """
 
-        # Very important delay
-        import time
-        time.sleep(0.001)
-
         if self.device:
             self.device.read(size)
 
+        if self.PACING != 'byte':
+            return self.__read_chunk__(size)
+
+        # Very important delay
+        time.sleep(0.001)
+
         try:
             return [next(self.raw)]
-        except:  #The file will be readed in infinite loop
+        except StopIteration:
+            if not self.LOOP:
+                self.eof = True
+                return []
+            #The file will be readed in infinite loop
             self.raw = self.__read_raw__()
             return [next(self.raw)]
 
 
+    #----------------------------------------------------------------------
+    def __read_chunk__(self, size):
+        """Return up to `size` bytes according to the pacing.
+
+        Parameters
+        ----------
+        size: int
+            Maximum number of bytes.
+
+        Returns
+        -------
+        bytes
+            Raw data, empty if the pacing does not allow more data yet.
+        """
+
+        if self.position >= len(self.data):
+            if not self.LOOP:
+                self.eof = True
+                return b''
+            self.__rewind__()
+
+        if self.start is None:
+            self.start = time.monotonic()
+
+        if self.PACING == 'realtime':
+            elapsed = (time.monotonic() - self.start) * self.SPEED
+            stop = int(np.interp(self.seconds[0] + elapsed, self.seconds, self.offsets))
+        else:
+            stop = len(self.data)
+
+        stop = min(stop, self.position + size)
+
+        if stop <= self.position:
+            time.sleep(0.001)
+            return b''
+
+        data = self.data[self.position:stop]
+        self.position = stop
+        return data
+
+
     #----------------------------------------------------------------------
     def write(self, data):
         """Write on serial port if available.
@@ -173,6 +341,8 @@ class GEDevice:
     TREND_10S = CONST.DRI_PH_10S_TREND
     TREND_60S = CONST.DRI_PH_60S_TREND
 
+    BUFFERS = ['bytearray', 'ring', 'list']
+
     # DEFAULT_REQUEST = ['date', 'ENTROPY RE', 'ENTROPY SE', 'ENTROPY BSR', 'TEMP (t1)', 'NIBP SYS',
                        # 'NIBP DIA', 'NIBP MEAN', 'CO2 ET','CO2 FI','CO2 RR', 'CO2 PAMB', 'O2 ET', 'O2 FI',
                        # 'N2O ET', 'N2O FI', 'AA ET', 'AA FI', 'AA',
@@ -217,23 +387,67 @@ class GEDevice:
 
 
     #----------------------------------------------------------------------
-    def __init__(self, raw_file=None):
+    def __init__(self, raw_file=None, buffer='bytearray', capacity=2**20, policy='overwrite', spill=None, capture=None, **replay):
         """Establish the connection and handle the data input from monitor.
 
         Parameters
         ----------
         raw_file : str, optional
             Read from local file, no serial.
+        buffer : str, 'bytearray'
+            Input buffer type, `bytearray` for a growing compact buffer,
+            `ring` for a fixed capacity `RingBuffer` or `list` for the legacy
+            list of integers.
+        capacity : int, 2**20
+            Bytes preallocated for the `ring` buffer.
+        policy : str, 'overwrite'
+            `ring` buffer policy when is full, `overwrite` or `spill`.
+        spill : str, file object, optional
+            Destination of the bytes discarded by the `spill` policy.
+        capture : str, SegmentedCapture, optional
+            Directory or `SegmentedCapture` for save the received bytes into
+            rolling segment files.
+        replay : dict, optional
+            `pacing`, `speed` and `loop` options for the `FakeDevice`.
         """
 
+        if not buffer in self.BUFFERS:
+            raise Exception('Buffer {} is not available'.format(buffer))
+
         if raw_file:
-            self.device = FakeDevice(raw_file)
+            self.device = FakeDevice(raw_file, **replay)
+
+        self.BUFFER_TYPE = buffer
+        self.BUFFER_OPTIONS = {'capacity': capacity, 'policy': policy, 'spill': spill, }
+
+        if isinstance(capture, str):
+            capture = SegmentedCapture(capture)
 
         self.READING = False
-        self.BUFFER = []
+        self.BUFFER = self.__new_buffer__()
+        self.NOTIFIER = DataNotifier()
+        self.CAPTURE = capture
         self.FAKE = bool(raw_file)
 
 
+    #----------------------------------------------------------------------
+    def __new_buffer__(self):
+        """Create an empty input buffer of the configured type.
+
+        Returns
+        -------
+        bytearray, RingBuffer, list
+            Empty buffer.
+        """
+
+        if self.BUFFER_TYPE == 'ring':
+            return RingBuffer(**self.BUFFER_OPTIONS)
+        elif self.BUFFER_TYPE == 'list':
+            return []
+        else:
+            return bytearray()
+
+
     #----------------------------------------------------------------------
     def connect(self, port, timeout=1):
         """Establish the connection with the CARESCAPE Monitor Bx50.
@@ -280,13 +494,16 @@ class GEDevice:
 
     #----------------------------------------------------------------------
     def close(self):
-        """Close serial port"""
+        """Close serial port and the current capture segment."""
 
         try:
             self.device.close()
         except:
             pass
 
+        if self.CAPTURE:
+            self.CAPTURE.close()
+
     #----------------------------------------------------------------------
     def request(self, subtype=None, waveform_set=None, interval=1):
         """Create and send a data request of Subrecord or/and Waveform type.
@@ -483,15 +700,29 @@ class GEDevice:
         Parameters
         ----------
         size: integer, 2**12
-           Input buffer size.
+           Maximum bytes for each read. The serial port only reads the bytes
+           already waiting (at least one), so a large size does not wait for
+           the timeout.
         """
 
-        size = 2 ** 8
-
         while self.READING:
             try:
-                data = self.device.read(size)
+                if isinstance(self.device, serial.Serial):
+                    data = self.device.read(min(size, max(self.device.in_waiting, 1)))
+                else:
+                    data = self.device.read(size)
                 self.BUFFER.extend(data)
+
+                if self.CAPTURE:
+                    self.CAPTURE.write(data)
+
+                # A FRAMECHAR could complete a frame
+                if CONST.FRAMECHAR in data:
+                    self.NOTIFIER.notify()
+
+                # End of a not looped replay
+                if self.FAKE and self.device.eof:
+                    self.READING = False
             except serial.SerialException:
                 self.READING = False
                 self.close()
@@ -502,7 +733,7 @@ class GEDevice:
     def clear_buffer(self):
         """Crear the data buffer, not the serial input buffer."""
 
-        self.BUFFER = []
+        self.BUFFER = self.__new_buffer__()
 
 
     #----------------------------------------------------------------------
@@ -1,5 +1,6 @@
 from datetime import datetime, date
 
+import numpy as np
 import pyedflib
 
 ########################################################################
@@ -92,6 +93,11 @@ class EDF:
         self.data_list = []
         self.anotations = []
 
+        # Streaming mode
+        self.writer = None
+        self.buffers = []
+        self.records = 0
+
 
     #----------------------------------------------------------------------
     def add_channel(self, channel):
@@ -107,18 +113,147 @@ class EDF:
 
 
     #----------------------------------------------------------------------
-    def save(self):
-        """Save as EDF+ file."""
+    def save(self, digital=False):
+        """Save as EDF+ file.
+
+        Parameters
+        ----------
+        digital : bool, False
+            The data of the channels are integer digital values, they are
+            written without conversions.
+        """
 
         f = pyedflib.EdfWriter(self.filename, len(self.channel_info), file_type=pyedflib.FILETYPE_EDFPLUS)
 
         f.setHeader(self.header)
         f.setSignalHeaders(self.channel_info)
-        f.writeSamples(self.data_list)
+        f.writeSamples(self.data_list, digital=digital)
+
+        for annotation in self.anotations:
+            f.writeAnnotation(*annotation)
 
         f.close()
 
 
+    #----------------------------------------------------------------------
+    def open(self, digital=False, backlog=10):
+        """Open the EDF+ file for streaming.
+
+        The header and the channels (without data) must be defined, then the
+        samples are written with `write` as they arrive. Each data record of
+        one second is written when all the channels have their samples, so
+        the file is valid until the last complete record.
+
+        Parameters
+        ----------
+        digital : bool, False
+            The samples are integer digital values, they are written without
+            conversions.
+        backlog : int, 10
+            Seconds of samples buffered for a channel while waiting for the
+            others, then the missing channels are completed with zeros. The
+            memory is bounded even if a channel never receives data.
+        """
+
+        self.writer = pyedflib.EdfWriter(self.filename, len(self.channel_info), file_type=pyedflib.FILETYPE_EDFPLUS)
+
+        self.writer.setHeader(self.header)
+        self.writer.setSignalHeaders(self.channel_info)
+
+        self.digital = digital
+        self.backlog = backlog
+        self.dtype = np.int32 if digital else np.float64
+
+        self.labels = {channel['label']: i for i, channel in enumerate(self.channel_info)}
+        self.buffers = [np.empty(0, dtype=self.dtype) for _ in self.channel_info]
+        self.records = 0
+
+        for annotation in self.anotations:
+            self.writer.writeAnnotation(*annotation)
+        self.anotations = []
+
+
+    #----------------------------------------------------------------------
+    def write(self, channel, samples):
+        """Append samples to a channel in streaming mode.
+
+        Parameters
+        ----------
+        channel : str, int
+            Channel label or index.
+        samples : array
+            Physical values, or digital values if the file was opened with
+            `digital`.
+        """
+
+        if self.writer is None:
+            raise Exception('The EDF+ file is not open for streaming')
+
+        if isinstance(channel, str):
+            channel = self.labels[channel]
+
+        self.buffers[channel] = np.concatenate([self.buffers[channel], np.asarray(samples, dtype=self.dtype)])
+        self.__flush__()
+
+
+    #----------------------------------------------------------------------
+    def __flush__(self):
+        """Write the data records completed by all the channels, the channels
+        that are behind more than `backlog` seconds are completed with zeros."""
+
+        rates = [channel['sample_rate'] for channel in self.channel_info]
+
+        while True:
+            while all(buffer.size >= rate for buffer, rate in zip(self.buffers, rates)):
+
+                # The channels must be written in order for each data record
+                for i, rate in enumerate(rates):
+                    if self.digital:
+                        self.writer.writeDigitalSamples(np.ascontiguousarray(self.buffers[i][:rate]))
+                    else:
+                        self.writer.writePhysicalSamples(np.ascontiguousarray(self.buffers[i][:rate]))
+                    self.buffers[i] = self.buffers[i][rate:]
+
+                self.records += 1
+
+            if not any(buffer.size >= self.backlog * rate for buffer, rate in zip(self.buffers, rates)):
+                break
+
+            self.__pad__()
+
+
+    #----------------------------------------------------------------------
+    def __pad__(self):
+        """Complete the current data record of each channel with zeros."""
+
+        for i, channel in enumerate(self.channel_info):
+            missing = max(channel['sample_rate'] - self.buffers[i].size, 0)
+            self.buffers[i] = np.concatenate([self.buffers[i], np.zeros(missing, dtype=self.dtype)])
+
+
+    #----------------------------------------------------------------------
+    def close(self, pad=True):
+        """Close the EDF+ file in streaming mode.
+
+        Parameters
+        ----------
+        pad : bool, True
+            Complete the last data records with zeros, otherwise the
+            incomplete records are discarded.
+        """
+
+        if self.writer is None:
+            return
+
+        while pad and any(buffer.size for buffer in self.buffers):
+            self.__pad__()
+            self.__flush__()
+
+        self.writer.close()
+        self.writer = None
+        self.buffers = []
+
+
     #----------------------------------------------------------------------
     def write_annotation(self, onset, description, duration=-1):
         """Writes an annotation/event to the file.
@@ -135,6 +270,11 @@ class EDF:
             Description of event
         """
 
+        # In streaming mode the annotations are written as they arrive
+        if self.writer is not None:
+            self.writer.writeAnnotation(onset, duration, description)
+            return
+
         self.anotations.append((onset, duration, description))
 
 
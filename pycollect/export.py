@@ -0,0 +1,255 @@
+"""
+======
+Export
+======
+
+Incremental CSV export of the decoded data.
+
+Each call to `export` appends only the rows decoded since the previous one,
+in chunks of bounded size, to plain or compressed (`gzip`, `bz2` or `xz`)
+files. The export can run in a background thread while the decoder keeps
+working:
+
+.. code:: ipython3
+
+    exporter = CSVExporter(decoder, 'case_0042', compression='gzip')
+
+    future = exporter.submit()  # during the session
+    future.result()  # list of filenames
+
+    exporter.export()
+    exporter.close()
+
+The result of a single export of all the data is the same of `to_csv` for
+the `DATA_SUBRECORD` and `DATA_WAVE` DataFrames.
+
+"""
+
+import io
+import os
+import bz2
+import gzip
+import lzma
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pandas import DataFrame, to_datetime
+
+from .storage import scale_samples
+
+COMPRESSIONS = {
+    None: (open, ''),
+    'gzip': (gzip.open, '.gz'),
+    'bz2': (bz2.open, '.bz2'),
+    'xz': (lzma.open, '.xz'),
+}
+
+
+########################################################################
+class CSVExporter:
+    """Append the new decoded data of a `GEDecode` to CSV files.
+
+    The subrecords are written to `<filename>.csv` and each waveform to
+    `<filename>.<waveform>.csv`, with the compression suffix if any. The
+    columns of the subrecords are fixed by the first export, when new
+    measures appear the next rows are written to a new part
+    `<filename>.part<n>.csv` with the extended header.
+    """
+
+    #----------------------------------------------------------------------
+    def __init__(self, decoder, filename, compression=None, chunksize=2**16):
+        """
+        Parameters
+        ----------
+        decoder : GEDecode
+            Decoder with the data, it can keep decoding between exports.
+        filename : str
+            Absolute or realtive path for CSV files.
+        compression : str, optional
+            `gzip`, `bz2` or `xz`.
+        chunksize : int, 2**16
+            Maximum rows converted to text each time.
+        """
+
+        if not compression in COMPRESSIONS:
+            raise Exception('Compression {} is not available'.format(compression))
+
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+
+        if not '.csv' in filename:
+            filename = filename + '.csv'
+
+        self.decoder = decoder
+        self.filename = filename
+        self.compression = compression
+        self.chunksize = chunksize
+
+        self.files = {}
+        self.filenames = []
+        self.cursors = {}  # Rows already exported
+        self.columns = None  # Columns of the subrecords
+        self.part = self.filename  # File of the subrecords, a new one for new columns
+        self.parts = 0
+
+        # A single worker keeps the exports in order
+        self.executor = None
+
+
+    #----------------------------------------------------------------------
+    def __open__(self, filename):
+        """Open the file at the first use, with the compression suffix."""
+
+        if not filename in self.files:
+            opener, suffix = COMPRESSIONS[self.compression]
+
+            self.files[filename] = opener(filename + suffix, 'wt', newline='')
+            self.filenames.append(filename + suffix)
+
+        return self.files[filename]
+
+
+    #----------------------------------------------------------------------
+    def __write__(self, filename, dataframe, start):
+        """Write the rows of a DataFrame in chunks.
+
+        Parameters
+        ----------
+        filename : str
+            CSV filename, without compression suffix.
+        dataframe : DataFrame
+            New rows.
+        start : int
+            Index of the first row.
+        """
+
+        header = not filename in self.files
+        file = self.__open__(filename)
+
+        dataframe.index = np.arange(start, start + len(dataframe))
+
+        for i in range(0, len(dataframe), self.chunksize):
+            buffer = io.StringIO()
+            dataframe.iloc[i:i + self.chunksize].to_csv(buffer, header=header and not i)
+            file.write(buffer.getvalue())
+
+        file.flush()
+
+
+    #----------------------------------------------------------------------
+    def __subrecords__(self):
+        """Export the new subrecords."""
+
+        store = self.decoder.STORE_SUBRECORD
+        start = self.cursors.get(None, 0)
+
+        # Snapshot, the decoder could be appending rows
+        size = store.size
+        if size <= start:
+            return
+
+        data = {}
+        for label, column in list(store.columns.items()):
+            values = column.array(start)[:size - start]
+            if len(values) < size - start:
+                values = np.concatenate([values, np.full(size - start - len(values), np.nan)])
+            data[label] = values
+        data['datetime'] = store.dates.array(start)[:size - start].copy()
+
+        if self.columns is None:
+            self.columns = sorted(data) if size - start > 1 else list(data)
+
+        # New measures are not dropped, a new part starts with all the columns
+        elif set(data) - set(self.columns):
+            self.columns = sorted(set(self.columns) | set(data))
+            self.parts += 1
+
+            if self.part in self.files:
+                self.files.pop(self.part).close()
+            self.part = self.filename.replace('.csv', '.part{}.csv'.format(self.parts))
+
+        dataframe = DataFrame(data).reindex(columns=self.columns)
+
+        self.__write__(self.part, dataframe, start)
+        self.cursors[None] = size
+
+
+    #----------------------------------------------------------------------
+    def __waveform__(self, name):
+        """Export the new samples of a waveform."""
+
+        store = self.decoder.STORE_WAVE
+        start = self.cursors.get(name, 0)
+
+        # Snapshot, the samples are stored before their blocks
+        blocks = store.blocks[name].array().copy()
+        ends = np.cumsum(blocks['length'])
+        size = int(ends[-1]) if ends.size else 0
+        if size <= start:
+            return
+
+        samples = store.samples[name].array(start, size)
+
+        # Skip the blocks before the cursor
+        first = np.searchsorted(ends, start, side='right')
+        blocks = blocks[first:]
+        blocks['length'][0] = ends[first] - start
+
+        shift = np.repeat(blocks['shift'], blocks['length'])
+        if blocks['integer'].all():
+            shift = shift.astype(np.int64)
+
+        values, _ = scale_samples(samples, shift)
+        dates = to_datetime(np.repeat(blocks['time'], blocks['length']), unit='s')
+
+        dataframe = DataFrame({'datetime': dates, 'values': values, })
+
+        self.__write__(self.filename.replace('.csv', '.{}.csv'.format(name)), dataframe, start)
+        self.cursors[name] = size
+
+
+    #----------------------------------------------------------------------
+    def export(self):
+        """Append the data decoded since the previous export.
+
+        Returns
+        -------
+        list
+            Filenames generated until now.
+        """
+
+        self.__subrecords__()
+
+        for name in list(self.decoder.STORE_WAVE):
+            self.__waveform__(name)
+
+        return list(self.filenames)
+
+
+    #----------------------------------------------------------------------
+    def submit(self):
+        """Run `export` in a background thread.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Completed with the result of `export`.
+        """
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+
+        return self.executor.submit(self.export)
+
+
+    #----------------------------------------------------------------------
+    def close(self):
+        """Wait for the pending exports and close the files."""
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+        for file in self.files.values():
+            file.close()
+
+        self.files = {}
@@ -96,7 +96,11 @@ All requests use this header:
 +-------------+--------------------------------------------------------------------------+
 """
 
+import struct
 from collections import OrderedDict
+
+import numpy as np
+
 from .dataconstants import CONST
 
 datex_header = [  #40 bytes
@@ -674,6 +678,183 @@ dri_trend10s = [
 
 
 
+# 2 bytes elements that are not signed measures.
+UNSIGNED_ELEMENTS = ['label', 'cl_drilvl_subt']
+
+
+#----------------------------------------------------------------------
+def layout_dtype(layout):
+    """Build a NumPy structured dtype from a header layout.
+
+    Elements of 2 bytes are little-endian signed 16 bits (the measures),
+    except the `UNSIGNED_ELEMENTS`, elements of 4 bytes (the status words) are
+    unsigned 32 bits and elements of 1 byte are unsigned 8 bits. Other sizes
+    are arrays of bytes.
+
+    Parameters
+    ----------
+    layout : list, OrderedDict
+        Header layout, nested headers are translated into nested dtypes.
+
+    Returns
+    -------
+    numpy.dtype
+        Structured dtype with the same size of the layout.
+    """
+
+    if isinstance(layout, OrderedDict):
+        layout = layout.items()
+
+    fields = []
+    for element, field in layout:
+
+        if isinstance(field, OrderedDict):
+            fields.append((element, layout_dtype(field)))
+            continue
+
+        size = field[0]
+        if size == 1:
+            fields.append((element, 'u1'))
+        elif size == 2 and element in UNSIGNED_ELEMENTS:
+            fields.append((element, '<u2'))
+        elif size == 2:
+            fields.append((element, '<i2'))
+        elif size == 4:
+            fields.append((element, '<u4'))
+        else:
+            fields.append((element, 'u1', (size, )))
+
+    return np.dtype(fields)
+
+
+PHDB_SUBCLASSES = ['basic', 'ext1', 'ext2', 'ext3']
+
+
+########################################################################
+class LayoutStruct:
+    """Flat header layout precompiled into a single `struct.Struct`.
+
+    Each element of the layout is translated into a little-endian `struct`
+    format, elements of 1, 2 and 4 bytes are unpacked as unsigned integers and
+    any other size as raw bytes. All the values of a header are unpacked (or
+    packed) with one C-level call.
+    """
+
+    FORMATS = {1: 'B', 2: 'H', 4: 'I'}
+
+    #----------------------------------------------------------------------
+    def __init__(self, layout):
+        """
+        Parameters
+        ----------
+        layout : list
+            List of tuples `(element, [size, default])`, nested headers are
+            not supported.
+        """
+
+        self.elements = []
+        self.defaults = {}
+        self.offsets = {}
+        self.sizes = {}
+        self.integers = set()
+
+        format_ = '<'
+        offset = 0
+
+        for element, (size, default) in layout:
+
+            if size in self.FORMATS:
+                format_ += self.FORMATS[size]
+                self.integers.add(element)
+            else:
+                format_ += '{}s'.format(size)
+
+            self.elements.append(element)
+            self.defaults[element] = default
+            self.offsets[element] = offset
+            self.sizes[element] = size
+            offset += size
+
+        self.struct = struct.Struct(format_)
+        self.size = self.struct.size
+
+
+    #----------------------------------------------------------------------
+    def unpack(self, data):
+        """Decode a raw header.
+
+        Parameters
+        ----------
+        data : bytes, array
+            Raw header, at least `size` bytes long.
+
+        Returns
+        -------
+        dict
+            Element name as key with integers or raw bytes as values.
+        """
+
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+
+        return dict(zip(self.elements, self.struct.unpack_from(data)))
+
+
+    #----------------------------------------------------------------------
+    def pack(self, values):
+        """Encode a header.
+
+        Parameters
+        ----------
+        values : dict
+            Element name as key, missing elements use the layout defaults.
+            Values could be integers or arrays of bytes.
+
+        Returns
+        -------
+        bytes
+            Raw header.
+        """
+
+        args = []
+        for element in self.elements:
+            value = values.get(element, self.defaults[element])
+
+            if element in self.integers:
+                if isinstance(value, (list, tuple, bytes, bytearray)):
+                    value = int.from_bytes(bytes(value), 'little')
+            elif isinstance(value, int):
+                value = value.to_bytes(self.sizes[element], 'little')
+            else:
+                value = bytes(value)
+
+            args.append(value)
+
+        return self.struct.pack(*args)
+
+
+    #----------------------------------------------------------------------
+    def raw(self, data, element):
+        """Return the raw bytes of one element, as transmitted.
+
+        Parameters
+        ----------
+        data : bytes
+            Raw header.
+        element : str
+            Header element.
+
+        Returns
+        -------
+        bytes
+            Bytes of the element.
+        """
+
+        offset = self.offsets[element]
+        return data[offset:offset + self.sizes[element]]
+
+
+
 ########################################################################
 class HeaderHandler:
     """Header Handler.
@@ -681,6 +862,9 @@ class HeaderHandler:
     Establish a way to read and write GE protocol headers.
     """
 
+    STRUCT = None
+    PATHS = {}  # Splitted paths for `bit` and `bits`
+
     #----------------------------------------------------------------------
     def __init__(self, data=None, init=None, size=None):
         """
@@ -780,8 +964,8 @@ class HeaderHandler:
         for element in self.DATA:
             e = inset_data[index]
             if isinstance(e, list):
-                self.DATA[element][1] = inset_data[index][:]
-                self.DATA[element] = self.DATA[element][:]
+                # New list, the initial ones are shared by the module layouts
+                self.DATA[element] = [self.DATA[element][0], inset_data[index][:]]
 
             else:
                 self.DATA[element] = inset_data[index]
@@ -845,15 +1029,12 @@ class HeaderHandler:
                 else:
                     # if index is a numeric index.
                     if arg.isdigit():
-                        dd = self.to32bits(target[1])
-                        if not reverse:
-                            dd = list(reversed(dd))
-                        return str(bool(int(dd[int(arg)])))
+                        return str(self.__bit__(target, int(arg), reverse))
 
                     # if index is a range
                     elif arg.replace('-', '0').isdigit():
                         l, h = [int(_) for _ in arg.split('-')]
-                        return int(''.join(map(str, self.to32bits(target[1])[l:h+1])), 2)
+                        return self.__bits__(target, l, h)
 
                     # normal index
                     else:
@@ -881,6 +1062,118 @@ class HeaderHandler:
             return int(bytes(value).hex(), 16)
 
 
+    #----------------------------------------------------------------------
+    def __field__(self, path):
+        """Return the header element of a path, the splitted paths are cached.
+
+        Parameters
+        ----------
+        path : str
+            Element path, like `basic:ecg:hdr:status`.
+
+        Returns
+        -------
+        list
+            Size in bytes and value.
+        """
+
+        keys = HeaderHandler.PATHS.get(path, None)
+        if keys is None:
+            keys = HeaderHandler.PATHS[path] = tuple(path.split(':'))
+
+        target = self.DATA
+        for key in keys:
+            target = target[key]
+
+        return target
+
+
+    #----------------------------------------------------------------------
+    def __integer__(self, field):
+        """Integer value and size in bits of a header element.
+
+        The values are stored with the most significant byte first, an integer
+        value is considered as 32 bits.
+        """
+
+        value = field[1]
+        if isinstance(value, int):
+            return value, 32
+
+        return int.from_bytes(bytes(value), 'big'), 8 * len(value)
+
+
+    #----------------------------------------------------------------------
+    def __bit__(self, field, n, reverse=False):
+        """Single bit of a header element, `reverse` counts from the most
+        significant bit."""
+
+        value, size = self.__integer__(field)
+
+        if reverse:
+            n = size - 1 - n
+
+        return bool((value >> n) & 1)
+
+
+    #----------------------------------------------------------------------
+    def __bits__(self, field, low, high):
+        """Integer with the bits `low` to `high` of a header element, counted
+        from the most significant bit."""
+
+        value, size = self.__integer__(field)
+
+        return (value >> (size - 1 - high)) & ((1 << (high - low + 1)) - 1)
+
+
+    #----------------------------------------------------------------------
+    def bit(self, path, n):
+        """Return a single bit of a header element.
+
+        Same result of `header['path:n'] == 'True'` without strings
+        conversions.
+
+        Parameters
+        ----------
+        path : str
+            Element path, like `basic:ecg:hdr:status`.
+        n : int
+            Bit index, `0` is the least significant bit.
+
+        Returns
+        -------
+        bool
+            The bit value.
+        """
+
+        return self.__bit__(self.__field__(path), n)
+
+
+    #----------------------------------------------------------------------
+    def bits(self, path, low, high):
+        """Return the integer generated with a range of bits.
+
+        Same result of `header['path:low-high']` without strings
+        conversions.
+
+        Parameters
+        ----------
+        path : str
+            Element path, like `basic:ecg:hdr:label_info`.
+        low : int
+            First bit, `0` is the most significant bit.
+        high : int
+            Last bit, included.
+
+        Returns
+        -------
+        int
+            Value of the bits.
+        """
+
+        return self.__bits__(self.__field__(path), low, high)
+
+
     #----------------------------------------------------------------------
     def to32bits(self, value):
         """Convert a value into a 32 bits array.
@@ -915,6 +1208,9 @@ class HeaderHandler:
             Single array with data header values, linke in C, C++, C#.
         """
 
+        if self.STRUCT is not None:
+            return list(self.STRUCT.pack({k: v[1] for k, v in self.DATA.items()}))
+
         array = []
         for _, v in self.DATA.items():
             bytes_, value = v
@@ -1002,6 +1298,7 @@ class DatexHeaderRequest(HeaderHandler):
     +-------------+--------------------------------------------------------------------------+
     """
     LENGTH = 49  #without checksum and flags
+    STRUCT = LayoutStruct(datex_header + phdb_request)
 
     #----------------------------------------------------------------------
     def __init__(self, *args, **kwargs):
@@ -1050,6 +1347,7 @@ class DatexHeaderWaveRequest(HeaderHandler):
     +-------------+--------------------------------------------------------------------------+
     """
     LENGTH = 72 #without checksum and flags
+    STRUCT = LayoutStruct(datex_header + wave_request)
 
     #----------------------------------------------------------------------
     def __init__(self, *args, **kwargs):
@@ -1084,12 +1382,126 @@ class DatexHeaderResponse(HeaderHandler):
     """
 
     LENGTH = 1490 #without checksum and flags
+    STRUCT = LayoutStruct(datex_header + response)
 
     #----------------------------------------------------------------------
-    def __init__(self, *args, **kwargs):
-        """"""
-        self.DATA = datex_header + response
-        super().__init__(*args, **kwargs)
+    def __init__(self, data=None):
+        """The header is decoded with the precompiled `STRUCT`, the nested
+        `DATA` format is only built if is requested.
+
+        Parameters
+        ----------
+        data : bytes, array
+            Load an array to build the header.
+        """
+
+        self.RAW = bytes(self.LENGTH)
+        self.VALUES = self.STRUCT.unpack(self.RAW)
+        self.__DATA__ = None
+
+        if data:
+            self.load(data)
+
+
+    #----------------------------------------------------------------------
+    def load(self, data):
+        """Load the `data` into the current header values.
+
+        Parameters
+        ----------
+        data : bytes, array
+            Load an array to build the header.
+        """
+
+        if not isinstance(data, bytes):
+            data = bytes(data)
+
+        self.RAW = data[:self.LENGTH]
+        self.VALUES = self.STRUCT.unpack(self.RAW)
+        self.__DATA__ = None
+
+
+    #----------------------------------------------------------------------
+    @property
+    def DATA(self):
+        """Header in the `HeaderHandler` nested format, built on demand."""
+
+        if self.__DATA__ is None:
+            self.__DATA__ = OrderedDict()
+            for element in self.STRUCT.elements:
+                value = list(reversed(self.raw(element)))
+                self.__DATA__[element] = [self.STRUCT.sizes[element], value]
+
+        return self.__DATA__
+
+
+    #----------------------------------------------------------------------
+    def set(self, element, value):
+        """Modify the value of one header element.
+
+        `VALUES` and `RAW` are updated (repacked with `STRUCT`) and the nested
+        `DATA` is rebuilt on the next request.
+
+        Parameters
+        ----------
+        element : str
+            Header element.
+        value : int, list
+            New value for element, lists in the `DATA` order.
+        """
+
+        assert element in self.STRUCT.sizes, '{} is not part of this header'.format(element)
+
+        if isinstance(value, (list, tuple)):
+            value = bytes(reversed(value))
+
+        if element in self.STRUCT.integers:
+            if isinstance(value, bytes):
+                value = int.from_bytes(value, 'little')
+        elif isinstance(value, int):
+            value = value.to_bytes(self.STRUCT.sizes[element], 'little')
+
+        self.VALUES[element] = value
+        self.RAW = self.STRUCT.pack(self.VALUES)
+        self.__DATA__ = None
+
+
+    #----------------------------------------------------------------------
+    def raw(self, element):
+        """Return the bytes of one element in the transmitted order.
+
+        Parameters
+        ----------
+        element : str
+            Header element.
+
+        Returns
+        -------
+        bytes
+            Bytes of the element.
+        """
+
+        return self.STRUCT.raw(self.RAW, element)
+
+
+    #----------------------------------------------------------------------
+    def __getitem__(self, element):
+        """Return value from header.
+
+        The integer elements and the byte arrays (`'data,'` and `'-data,'`)
+        are served directly from the precompiled decoding, any other format is
+        resolved by `HeaderHandler`.
+        """
+
+        if element in self.STRUCT.integers:
+            return self.VALUES[element]
+
+        if element.endswith(',') and not ':' in element:
+            if element.startswith('-'):
+                return list(self.raw(element[1:-1]))
+            return list(reversed(self.raw(element[:-1])))
+
+        return super().__getitem__(element)
 
 
     #----------------------------------------------------------------------
@@ -1133,6 +1545,15 @@ class PhysiologicalData(HeaderHandler):
 
     LENGTH = 1088 #without checksum and flags
 
+    # Structured dtype of the full record and for each 270 bytes subclass.
+    DTYPE = layout_dtype(dri_phdb)
+    SUBCLASS_DTYPE = OrderedDict([
+        ('basic', layout_dtype(basic_phdb)),
+        ('ext1', layout_dtype(ext1_phdb)),
+        ('ext2', layout_dtype(ext2_phdb)),
+        ('ext3', layout_dtype(ext3_phdb)),
+    ])
+
     #----------------------------------------------------------------------
     def __init__(self, *args, **kwargs):
         """"""
@@ -1140,6 +1561,34 @@ class PhysiologicalData(HeaderHandler):
         super().__init__(*args, **kwargs)
 
 
+    #----------------------------------------------------------------------
+    @classmethod
+    def frombuffer(cls, buffer, subclass=None):
+        """Decode many records at once.
+
+        Parameters
+        ----------
+        buffer : bytes
+            Consecutive raw records of 1088 bytes, or of 270 bytes if
+            `subclass` is defined.
+        subclass : str, optional
+            `basic`, `ext1`, `ext2` or `ext3`.
+
+        Returns
+        -------
+        numpy.recarray
+            Record array, the measures are accessible as
+            `records['basic']['ecg']['hr']`.
+        """
+
+        if subclass:
+            dtype = cls.SUBCLASS_DTYPE[subclass]
+        else:
+            dtype = cls.DTYPE
+
+        return np.frombuffer(buffer, dtype=dtype).view(np.recarray)
+
+
     #----------------------------------------------------------------------
     def __str__(self):
         """"""
@@ -0,0 +1,538 @@
+"""
+=======
+Session
+=======
+
+Append-only store on disk for the decoded data, the session survives a crash
+of the process (and of the system until the last `sync`) and its length is
+bounded by the disk instead of the memory.
+
+Each waveform is stored in a file of raw signed 16 bits samples and a file
+with the index of blocks (time, first sample, number of samples and scale).
+Each display measure is stored in typed columns aligned with the time of
+the records, numeric values and codes of labels, a measure with both kinds
+of values has both columns. The files are written as the data is decoded:
+
+.. code:: ipython3
+
+    session = SessionStore('case_0042')
+
+    decoder = GEDecode(device.BUFFER, store=False)
+    decoder.add_listener(session.append)
+    decoder.process(True)
+
+Other processes can read the session while is recorded, the files are
+memory-mapped without copies:
+
+.. code:: ipython3
+
+    reader = SessionReader('case_0042')
+
+    reader.samples('PLETH')  # numpy.memmap with the raw samples
+    reader.waveform('PLETH')  # DataFrame with `datetime` and `values`
+    reader.subrecords()  # DataFrame with the display measures
+
+"""
+
+import os
+import json
+import time
+
+import numpy as np
+from pandas import DataFrame, to_datetime
+
+from .decode import WaveBlock, DisplayRecord
+from .storage import scale_samples
+
+MANIFEST = 'manifest.json'
+VERSION = 2
+
+# Index of the waveform blocks
+BLOCK_DTYPE = np.dtype([('time', '<i8'), ('start', '<i8'), ('length', '<i8'), ('shift', '<f8'), ('integer', '?')])
+
+# Display measures: numeric values or codes of labels, and their missing value
+COLUMN_DTYPES = {'float': np.dtype('<f8'), 'label': np.dtype('<i4'), }
+MISSING = {'float': np.nan, 'label': -1, }
+
+
+########################################################################
+class SessionStore:
+    """Append-only writer of a session directory.
+
+    The `manifest.json` file describes the channels, it is replaced
+    atomically when a new waveform, measure or label appears. The samples
+    are always written before the block that references them, and the
+    display columns before the time of the record, so the readers only see
+    complete data.
+
+    The writes are not buffered, the data survives a crash of the process.
+    The files are synced to the disk each `fsync_interval` seconds, with
+    `sync` and with `close`.
+    """
+
+    #----------------------------------------------------------------------
+    def __init__(self, path, fsync_interval=5):
+        """
+        Parameters
+        ----------
+        path : str
+            Session directory, an existing session is continued.
+        fsync_interval : float, 5
+            Seconds between each `fsync`, the data written before is durable.
+        """
+
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.synced = time.monotonic()
+        os.makedirs(os.path.join(path, 'waves'), exist_ok=True)
+        os.makedirs(os.path.join(path, 'display'), exist_ok=True)
+
+        if os.path.exists(os.path.join(path, MANIFEST)):
+            with open(os.path.join(path, MANIFEST)) as file:
+                self.manifest = json.load(file)
+            if self.manifest.get('version', None) != VERSION:
+                raise Exception('Session version {} is not supported'.format(self.manifest.get('version', None)))
+        else:
+            self.manifest = {'version': VERSION, 'waves': {}, 'display': {'time': 'display/time.i8', 'columns': {}, }, }
+            self.__save_manifest__()
+
+        self.files = {}
+        self.__recover__()
+
+        # Samples and rows already written
+        self.samples = {name: self.__size__(wave['samples'], np.int16) for name, wave in self.manifest['waves'].items()}
+        self.rows = self.__size__(self.manifest['display']['time'], np.int64)
+
+        # Label codes of each display measure
+        self.labels = {label: {value: code for code, value in enumerate(column['labels'])}
+                       for label, column in self.manifest['display']['columns'].items()}
+
+
+    #----------------------------------------------------------------------
+    def __size__(self, filename, dtype):
+        """Number of complete elements in a file."""
+
+        filename = os.path.join(self.path, filename)
+        if not os.path.exists(filename):
+            return 0
+
+        return os.path.getsize(filename) // np.dtype(dtype).itemsize
+
+
+    #----------------------------------------------------------------------
+    def __truncate__(self, filename, dtype, size=None):
+        """Discard the incomplete elements at the end of a file.
+
+        Returns
+        -------
+        int
+            Number of complete elements kept.
+        """
+
+        complete = self.__size__(filename, dtype)
+        if size is not None:
+            complete = min(size, complete)
+
+        filename = os.path.join(self.path, filename)
+        if os.path.exists(filename):
+            os.truncate(filename, complete * np.dtype(dtype).itemsize)
+
+        return complete
+
+
+    #----------------------------------------------------------------------
+    def __recover__(self):
+        """Remove the data written after the last complete block and row,
+        after a crash the session can be continued."""
+
+        for wave in self.manifest['waves'].values():
+            self.__truncate__(wave['blocks'], BLOCK_DTYPE)
+            blocks = np.fromfile(os.path.join(self.path, wave['blocks']), dtype=BLOCK_DTYPE) if self.__size__(wave['blocks'], BLOCK_DTYPE) else []
+            size = int(blocks[-1]['start'] + blocks[-1]['length']) if len(blocks) else 0
+            self.__truncate__(wave['samples'], np.int16, size)
+
+        rows = self.__truncate__(self.manifest['display']['time'], np.int64)
+        for column in self.manifest['display']['columns'].values():
+            for kind, filename in column['files'].items():
+                self.__truncate__(filename, COLUMN_DTYPES[kind], rows)
+
+
+    #----------------------------------------------------------------------
+    def __save_manifest__(self):
+        """Replace the manifest atomically."""
+
+        filename = os.path.join(self.path, MANIFEST)
+        with open(filename + '.tmp', 'w') as file:
+            json.dump(self.manifest, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(filename + '.tmp', filename)
+
+
+    #----------------------------------------------------------------------
+    def __write__(self, filename, array):
+        """Append an array to a file, without buffering."""
+
+        if not filename in self.files:
+            self.files[filename] = open(os.path.join(self.path, filename), 'ab', buffering=0)
+
+        self.files[filename].write(np.ascontiguousarray(array).tobytes())
+
+
+    #----------------------------------------------------------------------
+    def append(self, record):
+        """Append a decoded record, can be used as a `GEDecode` listener.
+
+        Parameters
+        ----------
+        record : WaveBlock, DisplayRecord
+            Decoded record.
+        """
+
+        if isinstance(record, WaveBlock):
+            self.append_waveform(record.name, record.time, record.samples, record.shift)
+
+        elif isinstance(record, DisplayRecord):
+            self.append_subrecord(record.time, record.values)
+
+
+    #----------------------------------------------------------------------
+    def append_waveform(self, name, time_, samples, shift=None):
+        """Append a new block of samples.
+
+        Parameters
+        ----------
+        name : str
+            Waveform name.
+        time_ : int
+            Unix time for all the samples in the block.
+        samples : array
+            Signed 16 bits samples.
+        shift : int, float, optional
+            Scale for the block, `None` for not scaled samples.
+        """
+
+        if not name in self.manifest['waves']:
+            index = len(self.manifest['waves'])
+            self.manifest['waves'][name] = {
+                'samples': 'waves/{:04d}.i2'.format(index),
+                'blocks': 'waves/{:04d}.blocks'.format(index),
+            }
+            self.samples[name] = 0
+            self.__save_manifest__()
+
+        if shift is None:
+            shift = 1
+
+        samples = np.asarray(samples, dtype='<i2')
+        block = np.array([(time_, self.samples[name], samples.size, shift, isinstance(shift, int))], dtype=BLOCK_DTYPE)
+
+        wave = self.manifest['waves'][name]
+        self.__write__(wave['samples'], samples)
+        self.__write__(wave['blocks'], block)
+        self.samples[name] += samples.size
+
+
+    #----------------------------------------------------------------------
+    def __kind__(self, value):
+        """Kind of column for a value, `None` for missing values."""
+
+        if value is None:
+            return None
+
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return None if np.isnan(value) else 'float'
+
+        return 'label'
+
+
+    #----------------------------------------------------------------------
+    def append_subrecord(self, time_, values):
+        """Append the display measures of a record.
+
+        A measure starts without columns, the numeric column and the column
+        of label codes are added with the first value of each kind, the
+        previous rows are missing.
+
+        Parameters
+        ----------
+        time_ : int
+            Unix time of the record.
+        values : dict
+            Label as key and the value for this record.
+        """
+
+        columns = self.manifest['display']['columns']
+        changed = False
+
+        for label, value in values.items():
+            if not label in columns:
+                columns[label] = {'index': len(columns), 'files': {}, 'labels': [], }
+                self.labels[label] = {}
+                changed = True
+
+            kind = self.__kind__(value)
+            if kind is None or kind in columns[label]['files']:
+                continue
+
+            # New column, the previous rows are missing
+            filename = 'display/{:04d}.{}'.format(columns[label]['index'], COLUMN_DTYPES[kind].str[1:])
+            columns[label]['files'][kind] = filename
+            self.__write__(filename, np.full(self.rows, MISSING[kind], dtype=COLUMN_DTYPES[kind]))
+            changed = True
+
+        row = []
+        for label, column in columns.items():
+            value = values.get(label, None)
+            kind = self.__kind__(value)
+
+            if kind == 'label':
+                value = str(value)
+                if not value in self.labels[label]:
+                    self.labels[label][value] = len(column['labels'])
+                    column['labels'].append(value)
+                    changed = True
+                value = self.labels[label][value]
+
+            for kind_, filename in column['files'].items():
+                row.append((filename, kind_, value if kind_ == kind else MISSING[kind_]))
+
+        if changed:
+            self.__save_manifest__()
+
+        for filename, kind, value in row:
+            self.__write__(filename, np.array([value], dtype=COLUMN_DTYPES[kind]))
+
+        self.__write__(self.manifest['display']['time'], np.array([time_], dtype='<i8'))
+        self.rows += 1
+
+        if time.monotonic() - self.synced >= self.fsync_interval:
+            self.sync()
+
+
+    #----------------------------------------------------------------------
+    def sync(self):
+        """Write the data to the disk, it survives a crash of the system."""
+
+        for file in self.files.values():
+            os.fsync(file.fileno())
+
+        self.synced = time.monotonic()
+
+
+    #----------------------------------------------------------------------
+    def close(self):
+        """Close the files, the session can be continued later."""
+
+        self.sync()
+
+        for file in self.files.values():
+            file.close()
+
+        self.files = {}
+
+
+
+########################################################################
+class SessionReader:
+    """Read a session directory, also while is recorded.
+
+    The manifest is read again with `refresh`, the arrays are memory-mapped
+    with the elements completed until the call.
+    """
+
+    #----------------------------------------------------------------------
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str
+            Session directory.
+        """
+
+        self.path = path
+        self.refresh()
+
+
+    #----------------------------------------------------------------------
+    def refresh(self):
+        """Read the manifest again, for new channels and labels."""
+
+        with open(os.path.join(self.path, MANIFEST)) as file:
+            self.manifest = json.load(file)
+
+
+    #----------------------------------------------------------------------
+    @property
+    def waveforms(self):
+        """Names of the stored waveforms."""
+
+        return list(self.manifest['waves'])
+
+
+    #----------------------------------------------------------------------
+    @property
+    def measures(self):
+        """Labels of the stored display measures."""
+
+        return list(self.manifest['display']['columns'])
+
+
+    #----------------------------------------------------------------------
+    def __memmap__(self, filename, dtype, size=None):
+        """Read-only memory map of the complete elements of a file."""
+
+        filename = os.path.join(self.path, filename)
+        dtype = np.dtype(dtype)
+
+        available = os.path.getsize(filename) // dtype.itemsize if os.path.exists(filename) else 0
+        if size is not None:
+            available = min(size, available)
+
+        # Empty files can not be mapped
+        if not available:
+            return np.empty(0, dtype=dtype)
+
+        return np.memmap(filename, dtype=dtype, mode='r', shape=(available, ))
+
+
+    #----------------------------------------------------------------------
+    def blocks(self, name):
+        """Index of blocks of a waveform.
+
+        Parameters
+        ----------
+        name : str
+            Waveform name.
+
+        Returns
+        -------
+        numpy.memmap
+            Records with `time`, `start`, `length`, `shift` and `integer`.
+        """
+
+        return self.__memmap__(self.manifest['waves'][name]['blocks'], BLOCK_DTYPE)
+
+
+    #----------------------------------------------------------------------
+    def samples(self, name):
+        """Raw samples of a waveform, only the ones indexed by the blocks.
+
+        Parameters
+        ----------
+        name : str
+            Waveform name.
+
+        Returns
+        -------
+        numpy.memmap
+            Signed 16 bits samples.
+        """
+
+        blocks = self.blocks(name)
+        size = int(blocks['start'][-1] + blocks['length'][-1]) if blocks.size else 0
+
+        return self.__memmap__(self.manifest['waves'][name]['samples'], '<i2', size)
+
+
+    #----------------------------------------------------------------------
+    def waveform(self, name):
+        """Build the DataFrame of a waveform, like `WaveformStore`.
+
+        Parameters
+        ----------
+        name : str
+            Waveform name.
+
+        Returns
+        -------
+        DataFrame
+            DataFrame with `datetime` and `values` columns.
+        """
+
+        blocks = self.blocks(name)
+        samples = self.samples(name)
+
+        shift = np.repeat(blocks['shift'], blocks['length'])
+        if blocks['integer'].all():
+            shift = shift.astype(np.int64)
+
+        values, _ = scale_samples(samples, shift)
+        dates = to_datetime(np.repeat(blocks['time'], blocks['length']), unit='s')
+
+        return DataFrame({'datetime': dates, 'values': values, })
+
+
+    #----------------------------------------------------------------------
+    def times(self):
+        """Unix time of each display record.
+
+        Returns
+        -------
+        numpy.memmap
+            Times of the complete records.
+        """
+
+        return self.__memmap__(self.manifest['display']['time'], '<i8')
+
+
+    #----------------------------------------------------------------------
+    def measure(self, label):
+        """Values of a display measure, aligned with `times`.
+
+        Parameters
+        ----------
+        label : str
+            Measure label.
+
+        Returns
+        -------
+        numpy.memmap, ndarray
+            Memory map of floats for numeric measures, NaN for the missing
+            values. Array of objects for labels or measures with numbers and
+            labels, `None` for missing values.
+        """
+
+        column = self.manifest['display']['columns'][label]
+        size = len(self.times())
+
+        if list(column['files']) == ['float']:
+            return self.__memmap__(column['files']['float'], COLUMN_DTYPES['float'], size)
+
+        values = np.full(size, None, dtype=object)
+
+        if 'float' in column['files']:
+            numbers = self.__memmap__(column['files']['float'], COLUMN_DTYPES['float'], size)
+            present = ~np.isnan(numbers)
+            values[present] = numbers[present].tolist()
+
+        if 'label' in column['files']:
+            codes = self.__memmap__(column['files']['label'], COLUMN_DTYPES['label'], size)
+            present = codes != MISSING['label']
+            values[present] = np.array(column['labels'], dtype=object)[codes[present]]
+
+        return values
+
+
+    #----------------------------------------------------------------------
+    def subrecords(self, labels=None):
+        """Build the DataFrame of the display measures.
+
+        Parameters
+        ----------
+        labels : list, optional
+            Measures to read, by default all of them.
+
+        Returns
+        -------
+        DataFrame
+            One row for each record, the labels as columns and `datetime`.
+        """
+
+        if labels is None:
+            labels = self.measures
+
+        data = {label: np.array(self.measure(label)) for label in labels}
+        data['datetime'] = to_datetime(np.array(self.times()), unit='s')
+
+        return DataFrame(data, columns=sorted(data))
@@ -0,0 +1,771 @@
+"""
+=======
+Storage
+=======
+
+Columnar accumulators for the decoded data.
+
+The decoder appends each new block in amortized constant time, the Pandas
+DataFrames are only built when are requested and they are cached until new
+data arrives.
+
+.. code:: ipython3
+
+    store = WaveformStore()
+    store.append('PLETH', r_time, samples, shift=1/100)
+
+    store['PLETH']  # DataFrame with `datetime` and `values`
+
+The stores are shared by many consumers, each one with its own read cursor:
+
+.. code:: ipython3
+
+    view = WaveformView(store)
+    view.reset()  # only new samples will be visible
+
+The waveforms are scaled sample by sample, the special values of the monitor
+(`DATA_INVALID`, `DATA_NOT_UPDATED`, `DATA_DISCONT`, ...) are replaced by NaN
+and their codes are available in a companion status array:
+
+.. code:: ipython3
+
+    values, status = scale_samples(samples, shift=1/100)
+
+    store.status('PLETH')  # special code for each sample, 0 for valid ones
+
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+from pandas import DataFrame, to_datetime
+
+from .dataconstants import CONST
+
+
+#----------------------------------------------------------------------
+def scale_samples(samples, shift=1):
+    """Scale the raw waveform samples.
+
+    Parameters
+    ----------
+    samples : array
+        Signed 16 bits samples.
+    shift : int, float, array, 1
+        Scale for all the samples or for each one.
+
+    Returns
+    -------
+    ndarray
+        Scaled values, the special values are NaN. Integer samples with
+        integer scales and without special values keep an integer type.
+    ndarray
+        Special code (`DATA_INVALID`, `DATA_NOT_UPDATED`, ...) of each
+        sample, 0 for the valid ones.
+    """
+
+    samples = np.asarray(samples, dtype=np.int16)
+    shift = np.asarray(shift)
+
+    # Values below DATA_INVALID_LIMIT are reserved for the special codes
+    invalid = samples < CONST.DATA_INVALID_LIMIT
+    status = np.where(invalid, samples, 0).astype(np.int16)
+
+    if shift.dtype.kind in 'iub' and not invalid.any():
+        return samples.astype(np.int64) * shift.astype(np.int64), status
+
+    values = samples * shift.astype(np.float64)
+    values[invalid] = np.nan
+
+    return values, status
+
+
+########################################################################
+class ChunkedArray:
+    """Growable typed array with amortized O(1) appends.
+
+    The capacity is doubled each time is exhausted, so the data is always
+    contiguous and can be accessed as a NumPy view.
+    """
+
+    #----------------------------------------------------------------------
+    def __init__(self, dtype, capacity=1024):
+        """
+        Parameters
+        ----------
+        dtype : numpy.dtype
+            Type of the stored elements.
+        capacity : int, optional
+            Initial number of elements reserved.
+        """
+
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+
+    #----------------------------------------------------------------------
+    def __len__(self):
+        """"""
+        return self.size
+
+
+    #----------------------------------------------------------------------
+    def reserve(self, size):
+        """Ensure the capacity for `size` elements.
+
+        Parameters
+        ----------
+        size : int
+            Number of elements.
+        """
+
+        capacity = self.data.size
+        if size <= capacity:
+            return
+
+        while capacity < size:
+            capacity = max(2 * capacity, 1)
+
+        data = np.empty(capacity, dtype=self.data.dtype)
+        data[:self.size] = self.data[:self.size]
+        self.data = data
+
+
+    #----------------------------------------------------------------------
+    def append(self, value):
+        """Append a single element.
+
+        Parameters
+        ----------
+        value : scalar
+            New element.
+        """
+
+        self.reserve(self.size + 1)
+        self.data[self.size] = value
+        self.size += 1
+
+
+    #----------------------------------------------------------------------
+    def extend(self, values):
+        """Append an array of elements.
+
+        Parameters
+        ----------
+        values : array
+            New elements.
+        """
+
+        values = np.asarray(values)
+        self.reserve(self.size + values.size)
+        self.data[self.size:self.size + values.size] = values
+        self.size += values.size
+
+
+    #----------------------------------------------------------------------
+    def array(self, start=0, stop=None):
+        """Return a view of the stored elements.
+
+        Parameters
+        ----------
+        start : int, optional
+            First element.
+        stop : int, optional
+            Last element, not included.
+
+        Returns
+        -------
+        ndarray
+            A view, it is valid until the next append.
+        """
+
+        if stop is None:
+            stop = self.size
+
+        return self.data[start:stop]
+
+
+
+########################################################################
+class WaveformStore(Mapping):
+    """Dictionary-like storage of waveforms.
+
+    Each waveform keeps the raw signed 16 bits samples and a small index of
+    blocks (time, number of samples and scale). Accessing a waveform returns
+    a DataFrame with the `datetime` and `values` columns, like the previous
+    `DataFrame.append` based storage.
+    """
+
+    BLOCK_DTYPE = np.dtype([('time', '<i8'), ('length', '<i8'), ('shift', '<f8'), ('integer', '?')])
+
+    #----------------------------------------------------------------------
+    def __init__(self):
+        """"""
+
+        self.samples = {}
+        self.blocks = {}
+        self.cache = {}
+
+
+    #----------------------------------------------------------------------
+    def append(self, name, time_, samples, shift=None):
+        """Append a new block of samples.
+
+        Parameters
+        ----------
+        name : str
+            Waveform name.
+        time_ : int
+            Unix time for all the samples in the block.
+        samples : array
+            Signed 16 bits samples.
+        shift : int, float, optional
+            Scale for the block, `None` for not scaled samples. The special
+            values are never scaled, see `scale_samples`.
+        """
+
+        if not name in self.samples:
+            self.samples[name] = ChunkedArray(np.int16, capacity=2**14)
+            self.blocks[name] = ChunkedArray(self.BLOCK_DTYPE, capacity=2**8)
+
+        if shift is None:
+            shift = 1
+
+        samples = np.asarray(samples, dtype=np.int16)
+        self.samples[name].extend(samples)
+        self.blocks[name].append((time_, samples.size, shift, isinstance(shift, int)))
+        self.cache[name] = {}
+
+
+    #----------------------------------------------------------------------
+    def extend(self, name, samples, blocks):
+        """Append many blocks at once, like `append` for each one.
+
+        Parameters
+        ----------
+        name : str
+            Waveform name.
+        samples : array
+            Signed 16 bits samples of all the blocks.
+        blocks : array
+            Blocks with `BLOCK_DTYPE`, their lengths must sum the number of
+            samples.
+        """
+
+        if not name in self.samples:
+            self.samples[name] = ChunkedArray(np.int16, capacity=2**14)
+            self.blocks[name] = ChunkedArray(self.BLOCK_DTYPE, capacity=2**8)
+
+        self.samples[name].extend(np.asarray(samples, dtype=np.int16))
+        self.blocks[name].extend(np.asarray(blocks, dtype=self.BLOCK_DTYPE))
+        self.cache[name] = {}
+
+
+    #----------------------------------------------------------------------
+    def length(self, name):
+        """Number of samples stored for a waveform.
+
+        Parameters
+        ----------
+        name : str
+            Waveform name.
+
+        Returns
+        -------
+        int
+            Number of samples, 0 for unknown waveforms.
+        """
+
+        if not name in self.samples:
+            return 0
+
+        return len(self.samples[name])
+
+
+    #----------------------------------------------------------------------
+    def dataframe(self, name, start=0):
+        """Build the DataFrame of a waveform.
+
+        Parameters
+        ----------
+        name : str
+            Waveform name.
+        start : int, optional
+            First sample, used by the read cursors.
+
+        Returns
+        -------
+        DataFrame
+            DataFrame with `datetime` and `values` columns, a copy that
+            can be modified without change the stored data.
+        """
+
+        # The cached DataFrame is never returned, the users can modify the copy
+        if start in self.cache[name]:
+            return self.cache[name][start].copy()
+
+        blocks = self.blocks[name].array()
+        samples = self.samples[name].array(start)
+
+        # Skip the blocks before the cursor.
+        ends = np.cumsum(blocks['length'])
+        first = np.searchsorted(ends, start, side='right')
+        blocks = blocks[first:].copy()
+        if blocks.size:
+            blocks['length'][0] = ends[first] - start
+
+        shift = np.repeat(blocks['shift'], blocks['length'])
+
+        if blocks['integer'].all():
+            shift = shift.astype(np.int64)
+
+        values, _ = scale_samples(samples, shift)
+
+        dates = to_datetime(np.repeat(blocks['time'], blocks['length']), unit='s')
+
+        self.cache[name][start] = DataFrame({'datetime': dates, 'values': values, })
+        return self.cache[name][start].copy()
+
+
+    #----------------------------------------------------------------------
+    def digital(self, name):
+        """Raw samples of a waveform with a single scale, for lossless exports.
+
+        Parameters
+        ----------
+        name : str
+            Waveform name.
+
+        Returns
+        -------
+        ndarray
+            Signed 16 bits samples, the special values are replaced by 0.
+        float
+            Scale of all the samples, `None` if the blocks have different
+            scales.
+        """
+
+        shifts = np.unique(self.blocks[name].array()['shift'])
+        if shifts.size != 1:
+            return None, None
+
+        samples = self.samples[name].array()
+        samples = np.where(samples < CONST.DATA_INVALID_LIMIT, 0, samples).astype(np.int16)
+
+        return samples, float(shifts[0])
+
+
+    #----------------------------------------------------------------------
+    def status(self, name, start=0):
+        """Special codes of a waveform.
+
+        Parameters
+        ----------
+        name : str
+            Waveform name.
+        start : int, optional
+            First sample.
+
+        Returns
+        -------
+        ndarray
+            Special code (`DATA_INVALID`, `DATA_NOT_UPDATED`, ...) of each
+            sample, 0 for the valid ones.
+        """
+
+        samples = self.samples[name].array(start)
+        return np.where(samples < CONST.DATA_INVALID_LIMIT, samples, 0).astype(np.int16)
+
+
+    #----------------------------------------------------------------------
+    def __getitem__(self, name):
+        """"""
+
+        if not name in self.samples:
+            raise KeyError(name)
+
+        return self.dataframe(name)
+
+
+    #----------------------------------------------------------------------
+    def __contains__(self, name):
+        """"""
+        return name in self.samples
+
+
+    #----------------------------------------------------------------------
+    def __iter__(self):
+        """"""
+        return iter(self.samples)
+
+
+    #----------------------------------------------------------------------
+    def __len__(self):
+        """"""
+        return len(self.samples)
+
+
+
+########################################################################
+class WaveformView(Mapping):
+    """Read cursor over a `WaveformStore`.
+
+    Only the samples appended after the last `reset` are visible, the store
+    is shared so the data is not duplicated.
+    """
+
+    #----------------------------------------------------------------------
+    def __init__(self, store):
+        """
+        Parameters
+        ----------
+        store : WaveformStore
+            Shared storage.
+        """
+
+        self.store = store
+        self.cursors = {}
+
+
+    #----------------------------------------------------------------------
+    def reset(self):
+        """Hide all the samples stored until now."""
+
+        self.cursors = {name: self.store.length(name) for name in self.store}
+
+
+    #----------------------------------------------------------------------
+    def __getitem__(self, name):
+        """"""
+
+        if not name in self:
+            raise KeyError(name)
+
+        return self.store.dataframe(name, self.cursors.get(name, 0))
+
+
+    #----------------------------------------------------------------------
+    def __contains__(self, name):
+        """"""
+        return self.store.length(name) > self.cursors.get(name, 0)
+
+
+    #----------------------------------------------------------------------
+    def __iter__(self):
+        """"""
+        return (name for name in self.store if name in self)
+
+
+    #----------------------------------------------------------------------
+    def __len__(self):
+        """"""
+        return len(list(iter(self)))
+
+
+
+########################################################################
+class SubrecordColumn:
+    """Single column of the `SubrecordStore`.
+
+    Integer and float values are stored in typed arrays, any other value
+    (labels from the measures dictionaries, `None`, booleans) switches the
+    column to a Python list of objects.
+    """
+
+    #----------------------------------------------------------------------
+    def __init__(self, missing=0):
+        """
+        Parameters
+        ----------
+        missing : int, optional
+            Number of previous rows without value for this column.
+        """
+
+        self.kind = 'int'
+        self.values = ChunkedArray(np.int64, capacity=2**8)
+        self.missing = False
+
+        if missing:
+            self.pad(missing)
+
+
+    #----------------------------------------------------------------------
+    def __len__(self):
+        """"""
+        return len(self.values)
+
+
+    #----------------------------------------------------------------------
+    def convert(self, kind):
+        """Change the storage of the column.
+
+        Parameters
+        ----------
+        kind : str
+            `float` or `object`.
+        """
+
+        if kind == 'float':
+            values = ChunkedArray(np.float64, capacity=max(len(self.values), 2**8))
+            values.extend(self.values.array())
+        else:
+            values = self.values.array().tolist()
+
+        self.values = values
+        self.kind = kind
+
+
+    #----------------------------------------------------------------------
+    def append(self, value):
+        """Append a new value.
+
+        Parameters
+        ----------
+        value : scalar
+            New value.
+        """
+
+        if self.kind == 'object':
+            self.values.append(value)
+            return
+
+        if isinstance(value, int) and not isinstance(value, bool):
+            pass
+        elif isinstance(value, float):
+            if self.kind == 'int':
+                self.convert('float')
+        else:
+            self.convert('object')
+
+        self.values.append(value)
+
+
+    #----------------------------------------------------------------------
+    def pad(self, count):
+        """Append missing values.
+
+        Parameters
+        ----------
+        count : int
+            Number of rows without value.
+        """
+
+        self.missing = True
+
+        if self.kind == 'int':
+            self.convert('float')
+
+        if self.kind == 'object':
+            self.values.extend([np.nan] * count)
+        else:
+            self.values.extend(np.full(count, np.nan))
+
+
+    #----------------------------------------------------------------------
+    def extend(self, values, present=None):
+        """Append many values at once, with the same result of `append` and
+        `pad` for each one.
+
+        Parameters
+        ----------
+        values : list
+            Values of the rows with value.
+        present : array, optional
+            Boolean mask of the rows with value, the others are missing. By
+            default all the rows have value.
+        """
+
+        if present is None:
+            present = np.ones(len(values), dtype=bool)
+
+        present = np.asarray(present, dtype=bool)
+        count = present.size
+
+        if not present.all():
+            self.missing = True
+
+        # The first non numeric value switches the column to objects, the
+        # values before keep the type of the column at that point
+        switch = next((i for i, value in enumerate(values) if not isinstance(value, (int, float)) or isinstance(value, bool)), len(values))
+        prefix = int(np.flatnonzero(present)[switch]) if switch < len(values) else count
+
+        if self.kind != 'object':
+            floats = not present[:prefix].all() or any(issubclass(type_, float) for type_ in set(map(type, values[:switch])))
+            if self.kind == 'int' and floats:
+                self.convert('float')
+
+            column = np.full(prefix, np.nan) if self.kind == 'float' else np.empty(prefix, dtype=np.int64)
+            column[present[:prefix]] = values[:switch]
+            self.values.extend(column)
+
+            if prefix == count:
+                return
+
+            self.convert('object')
+            present, values = present[prefix:], values[switch:]
+
+        if present.all():
+            self.values.extend(values)
+            return
+
+        rows = np.full(present.size, np.nan, dtype=object)
+        rows[np.flatnonzero(present)] = values
+        self.values.extend(rows.tolist())
+
+
+    #----------------------------------------------------------------------
+    def array(self, start=0):
+        """Return the column values.
+
+        Parameters
+        ----------
+        start : int, optional
+            First row.
+
+        Returns
+        -------
+        ndarray
+            Typed array or array of objects.
+        """
+
+        if self.kind == 'object':
+            values = self.values[start:]
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            return array
+
+        return self.values.array(start).copy()
+
+
+
+########################################################################
+class SubrecordStore:
+    """Column-oriented storage of the display subrecords.
+
+    Each row is a dictionary with measure labels as keys and the `datetime`
+    of the record, the rows are appended in amortized constant time and the
+    DataFrame is only built when requested. The columns are sorted like the
+    previous `DataFrame.append(..., sort=True)` based storage.
+    """
+
+    #----------------------------------------------------------------------
+    def __init__(self):
+        """"""
+
+        self.columns = {}
+        self.dates = ChunkedArray('datetime64[ns]', capacity=2**8)
+        self.size = 0
+        self.cache = {}
+
+
+    #----------------------------------------------------------------------
+    def __len__(self):
+        """"""
+        return self.size
+
+
+    #----------------------------------------------------------------------
+    @property
+    def empty(self):
+        """"""
+        return self.size == 0
+
+
+    #----------------------------------------------------------------------
+    def append(self, row):
+        """Append a new row.
+
+        Parameters
+        ----------
+        row : dict
+            Label as key and the value for this record, must contain the
+            `datetime` key. Empty rows are ignored.
+        """
+
+        if not row:
+            return
+
+        row = dict(row)
+        self.dates.append(np.datetime64(row.pop('datetime'), 'ns'))
+
+        for label, value in row.items():
+            if not label in self.columns:
+                self.columns[label] = SubrecordColumn(missing=self.size)
+            self.columns[label].append(value)
+
+        self.size += 1
+
+        if len(row) != len(self.columns):
+            for column in self.columns.values():
+                if len(column) < self.size:
+                    column.pad(self.size - len(column))
+
+        self.cache = {}
+
+
+    #----------------------------------------------------------------------
+    def extend(self, dates, columns):
+        """Append many rows at once, with the same result of `append` for
+        each one.
+
+        Parameters
+        ----------
+        dates : array
+            `datetime` of each row.
+        columns : dict
+            Label as key, in order of appearance, and a tuple with the list
+            of values and the boolean mask of the rows with value.
+        """
+
+        count = len(dates)
+        if not count:
+            return
+
+        self.dates.extend(np.asarray(dates, dtype='datetime64[ns]'))
+
+        for label, (values, present) in columns.items():
+            if not label in self.columns:
+                self.columns[label] = SubrecordColumn(missing=self.size)
+            self.columns[label].extend(values, present)
+
+        for label, column in self.columns.items():
+            if not label in columns:
+                column.pad(count)
+
+        self.size += count
+        self.cache = {}
+
+
+    #----------------------------------------------------------------------
+    def dataframe(self, start=0):
+        """Build the DataFrame of the subrecords.
+
+        Parameters
+        ----------
+        start : int, optional
+            First row, used by the read cursors.
+
+        Returns
+        -------
+        DataFrame
+            One row for each record and the labels as columns, a copy that
+            can be modified without change the stored data.
+        """
+
+        # The cached DataFrame is never returned, the users can modify the copy
+        if not start in self.cache:
+
+            if self.size <= start:
+                self.cache[start] = DataFrame()
+                return self.cache[start].copy()
+
+            data = {label: column.array(start) for label, column in self.columns.items()}
+            data['datetime'] = self.dates.array(start).copy()
+
+            columns = list(data.keys())
+            if self.size - start > 1:
+                columns = sorted(columns)
+
+            self.cache[start] = DataFrame(data, columns=columns)
+
+        return self.cache[start].copy()
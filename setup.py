@@ -21,6 +21,10 @@ setup(
                         'pandas>=0.23.1',
                         ],
 
+    entry_points = {
+        'console_scripts': ['pycollect-batch=pycollect.batch:main'],
+    },
+
     include_package_data = True,
     license = 'BSD License',
     description = "PyCollect is a software package for collecting data from the GE patient monitors.",
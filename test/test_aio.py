@@ -0,0 +1,73 @@
+import os
+import asyncio
+
+from pycollect import GEDecode, database
+from pycollect.decode import WaveBlock
+from pycollect.aio import AsyncGEDevice
+
+RAW = sorted(database.RAWS_ABSPATH)[2]
+
+
+#----------------------------------------------------------------------
+def samples(store):
+    """Total number of waveform samples in a store."""
+
+    return sum(store.length(name) for name in store)
+
+
+#----------------------------------------------------------------------
+async def stream_from_pty(data):
+    """Write the raw data into a pty and decode it from the other end."""
+
+    master, slave = os.openpty()
+
+    device = AsyncGEDevice()
+    assert device.connect(os.ttyname(slave))
+    os.close(slave)
+    device.collect(True)
+
+    decoder = GEDecode(device.BUFFER, notifier=device.NOTIFIER)
+    reference = GEDecode(data)
+    expected = samples(reference.STORE_WAVE), len(reference.STORE_SUBRECORD)
+    received = [0, 0]
+
+    #----------------------------------------------------------------------
+    async def write():
+        for i in range(0, len(data), 4096):
+            os.write(master, data[i:i + 4096])
+            await asyncio.sleep(0.001)
+
+    writer = asyncio.ensure_future(write())
+
+    records = []
+    async for record in decoder.stream(delay=0.1):
+        records.append(record)
+        if isinstance(record, WaveBlock):
+            received[0] += len(record.samples)
+        else:
+            received[1] += 1
+        if tuple(received) == expected:
+            break
+
+    await writer
+    device.collect(False)
+    device.close()
+    os.close(master)
+
+    return device, decoder, records
+
+
+#----------------------------------------------------------------------
+def test_stream_from_pty():
+    with open(RAW, 'rb') as file:
+        data = file.read()
+
+    device, decoder, records = asyncio.run(asyncio.wait_for(stream_from_pty(data), 30))
+
+    reference = GEDecode(data)
+
+    assert bytes(device.BUFFER) == data
+    assert decoder.DATA_SUBRECORD.to_csv() == reference.DATA_SUBRECORD.to_csv()
+    assert sum(len(record.samples) for record in records if isinstance(record, WaveBlock)) == samples(reference.STORE_WAVE)
+    for name in reference.STORE_WAVE:
+        assert (decoder.DATA_WAVE[name].values == reference.DATA_WAVE[name].values).all()
@@ -0,0 +1,66 @@
+import mmap
+
+import pandas as pd
+
+from pycollect import database
+from pycollect.batch import decode_parallel, split_capture, seed_image
+from pycollect.decode import GEDecode
+
+RAW = sorted(database.RAWS_ABSPATH)[1]
+
+
+########################################################################
+class ModuleChanges(GEDecode):
+    """Decoder that keeps the calls to `on_module_change`."""
+
+    #----------------------------------------------------------------------
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.changes = []
+
+    #----------------------------------------------------------------------
+    def on_module_change(self, date_):
+        self.changes.append((date_, self.MODULES, self.MODULES_ACTIVE, self.MEANSURES_AVAILABLE))
+
+
+#----------------------------------------------------------------------
+def image_at(filename, start):
+    """`IMAGE` of the sequential decoder at a split point."""
+
+    decoder = GEDecode([], store=False)
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        decoder.BUFFER = buffer
+        decoder.__processing__(stop=start)
+        decoder.clear_buffer()
+
+    return decoder.IMAGE
+
+
+#----------------------------------------------------------------------
+def test_parallel_equals_sequential():
+    sequential = ModuleChanges.from_file(RAW)
+    parallel = decode_parallel(RAW, workers=2, chunks=6, min_chunk=0, decoder_class=ModuleChanges)
+
+    assert parallel.DATA_SUBRECORD.to_csv() == sequential.DATA_SUBRECORD.to_csv()
+
+    assert list(parallel.DATA_WAVE) == list(sequential.DATA_WAVE)
+    for name in sequential.DATA_WAVE:
+        pd.testing.assert_frame_equal(parallel.DATA_WAVE[name], sequential.DATA_WAVE[name])
+
+    assert parallel.changes == sequential.changes
+    assert parallel.MODULES == sequential.MODULES
+
+
+#----------------------------------------------------------------------
+def test_seed_image_equals_sequential():
+    for warmup in (2**16, 64):
+        for start, stop, storing, bitshift, seed in split_capture(RAW, 5, warmup=warmup)[1:]:
+            assert seed_image(RAW, start, seed) == image_at(RAW, start)
+
+
+#----------------------------------------------------------------------
+def test_small_captures_are_decoded_sequentially():
+    decoder = decode_parallel(RAW, workers=2, decoder_class=ModuleChanges)
+
+    assert isinstance(decoder, ModuleChanges)
+    assert decoder.DATA_SUBRECORD.to_csv() == ModuleChanges.from_file(RAW).DATA_SUBRECORD.to_csv()
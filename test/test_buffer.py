@@ -0,0 +1,23 @@
+from pycollect.buffer import RingBuffer
+
+
+#----------------------------------------------------------------------
+def test_view_is_a_copy():
+    buffer = RingBuffer(8)
+    buffer.extend(b'abcdef')
+
+    view = buffer.view(2, 6)
+    buffer.extend(b'XYZWVU')  # overwrites the viewed bytes
+
+    assert view == b'cdef'
+    assert bytes(buffer) == b'efXYZWVU'
+
+
+#----------------------------------------------------------------------
+def test_overwritten_bytes_are_skipped():
+    buffer = RingBuffer(4)
+    buffer.extend(b'abcdef')
+
+    assert buffer.start == 2
+    assert buffer.view(0, 6) == b'cdef'
+    assert buffer[4:] == b'ef'
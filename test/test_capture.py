@@ -0,0 +1,81 @@
+import os
+import json
+import random
+
+from pycollect import database
+from pycollect.capture import SegmentedCapture, MANIFEST, R_TIME
+from pycollect.deframe import Deframer
+
+RAW = sorted(database.RAWS_ABSPATH)[2]
+
+
+#----------------------------------------------------------------------
+def capture(path, data, **kwargs):
+    """Write the data in random chunks and close the capture."""
+
+    capture = SegmentedCapture(path, **kwargs)
+    rand = random.Random(0)
+
+    position = 0
+    while position < len(data):
+        size = rand.randint(1, 2**12)
+        capture.write(data[position:position + size])
+        position += size
+
+    capture.close()
+    return capture
+
+
+#----------------------------------------------------------------------
+def test_rollover_and_manifest(tmp_path):
+    with open(RAW, 'rb') as file:
+        data = file.read()
+
+    path = str(tmp_path / 'case')
+    segments = capture(path, data, max_bytes=2**14).segments
+
+    with open(os.path.join(path, MANIFEST)) as file:
+        assert json.load(file)['segments'] == segments
+
+    assert len(segments) > 2
+    assert [segment['filename'] for segment in segments] == ['capture-{:04d}.raw'.format(i) for i in range(len(segments))]
+    assert all(segment['closed'] for segment in segments)
+    assert all(segment['bytes'] >= 2**14 for segment in segments[:-1])
+
+    # The segments are the original data splitted after a closing delimiter
+    raws = []
+    for segment in segments:
+        with open(os.path.join(path, segment['filename']), 'rb') as file:
+            raws.append(file.read())
+        assert len(raws[-1]) == segment['bytes']
+    assert b''.join(raws) == data
+
+    # Each segment is decoded alone with the same frames
+    frames = Deframer().feed(data)
+    alone = []
+    for raw, segment in zip(raws, segments):
+        frames_ = Deframer(segment['storing'], segment['bitshift']).feed(raw)
+        assert not segment['storing']
+        assert len(frames_) == segment['frames']
+
+        times = [int.from_bytes(bytes(frame[R_TIME]), 'little') for frame in frames_]
+        assert segment['first_time'] == times[0]
+        assert segment['last_time'] == times[-1]
+
+        alone.extend(frames_)
+
+    assert alone == frames
+
+
+#----------------------------------------------------------------------
+def test_existing_capture_is_continued(tmp_path):
+    with open(RAW, 'rb') as file:
+        data = file.read()[:2**15]
+
+    path = str(tmp_path / 'case')
+    first = capture(path, data, max_bytes=2**14).segments
+    second = capture(path, data, max_bytes=2**14).segments
+
+    assert second[:len(first)] == first
+    assert len(second) == 2 * len(first)
+    assert second[-1]['filename'] == 'capture-{:04d}.raw'.format(len(second) - 1)
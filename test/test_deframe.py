@@ -0,0 +1,167 @@
+import random
+
+from pycollect import database
+from pycollect.dataconstants import CONST
+from pycollect.decode import GEDecode
+from pycollect.deframe import Deframer
+
+RAW = sorted(database.RAWS_ABSPATH)[2]
+
+
+#----------------------------------------------------------------------
+def legacy(data):
+    """Frames of the byte-by-byte state machine, with the closing position."""
+
+    decoder = GEDecode([], engine='python')
+    frames = []
+
+    for index, byte in enumerate(data):
+        decoder.__create_framelist__(byte)
+        frames.extend((index, frame) for frame in decoder.frame_list)
+        decoder.frame_list = []
+
+    return frames
+
+
+#----------------------------------------------------------------------
+def frame(payload, valid=True):
+    """Build an escaped frame."""
+
+    checksum = sum(payload) & 0xff
+    if not valid:
+        checksum ^= 0xff
+
+    data = [CONST.FRAMECHAR]
+    for byte in payload + [checksum]:
+        if byte in (CONST.FRAMECHAR, CONST.CTRLCHAR):
+            data.extend([CONST.CTRLCHAR, byte & ~CONST.BIT5])
+        else:
+            data.append(byte)
+    data.append(CONST.FRAMECHAR)
+
+    return bytes(data)
+
+
+#----------------------------------------------------------------------
+def synthetic():
+    """Frames with escaped bytes, wrong checksums, empty frames and noise."""
+
+    return b''.join([
+        b'\x01\x02',
+        frame([1, 2, 3]),
+        frame([CONST.FRAMECHAR, 5, CONST.CTRLCHAR]),
+        frame([9, 9], valid=False),
+        bytes([CONST.FRAMECHAR, CONST.FRAMECHAR]),
+        frame([CONST.CTRLCHAR] * 3 + [0x40, 0x3f]),
+        frame(list(range(0x70, 0x80))),
+        frame([0x5e, 0x02]),
+        bytes([CONST.FRAMECHAR, 1, 2, CONST.CTRLCHAR]),
+    ])
+
+
+#----------------------------------------------------------------------
+def split(data, cuts):
+    """Split `data` at the positions in `cuts`."""
+
+    bounds = [0] + sorted(cuts) + [len(data)]
+    return [data[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+#----------------------------------------------------------------------
+def compare(data, chunks):
+    """`feed` returns for each chunk the frames that legacy closes in it."""
+
+    expected = legacy(data)
+    deframer = Deframer()
+    position = 0
+
+    for chunk in chunks:
+        position += len(chunk)
+        frames = [frame for index, frame in expected if position - len(chunk) <= index < position]
+        assert deframer.feed(chunk) == frames
+
+    return deframer
+
+
+#----------------------------------------------------------------------
+def test_synthetic_frames():
+    data = synthetic()
+    frames = [frame for _, frame in legacy(data)]
+
+    assert len(frames) == 5
+    assert Deframer().feed(data) == frames
+
+
+#----------------------------------------------------------------------
+def test_every_split_point():
+    data = synthetic()
+
+    for cut in range(len(data) + 1):
+        compare(data, split(data, [cut]))
+
+
+#----------------------------------------------------------------------
+def test_escape_split_across_feeds():
+    data = synthetic()
+
+    # Each chunk ends with a CTRLCHAR, the escaped byte starts the next one
+    cuts = [i + 1 for i, byte in enumerate(data[:-1]) if byte == CONST.CTRLCHAR]
+    assert cuts
+
+    compare(data, split(data, cuts))
+
+
+#----------------------------------------------------------------------
+def test_ctrlchar_as_last_byte():
+    data = synthetic()
+    assert data[-1] == CONST.CTRLCHAR
+
+    deframer = compare(data, [data])
+    assert deframer.storing and deframer.carry.size
+
+    # The pending escape is applied to the first byte of the next feed
+    tail = bytes([CONST.FRAMECHAR & ~CONST.BIT5, (3 + CONST.FRAMECHAR) & 0xff, CONST.FRAMECHAR])
+    expected = [frame for index, frame in legacy(data + tail) if index >= len(data)]
+    assert expected == [[1, 2, CONST.FRAMECHAR, (3 + CONST.FRAMECHAR) & 0xff]]
+    assert deframer.feed(tail) == expected
+
+
+#----------------------------------------------------------------------
+def test_empty_feed():
+    data = synthetic()
+    chunks = split(data, [10, 10, 20])
+    chunks.insert(0, b'')
+    chunks.append(b'')
+
+    assert b'' in chunks[1:-1]
+    compare(data, chunks)
+
+
+#----------------------------------------------------------------------
+def test_skip_then_feed():
+    data = synthetic()
+    expected = legacy(data)
+
+    for cut in range(len(data) + 1):
+        deframer = Deframer()
+        deframer.skip(data[:cut])
+        frames = [frame for index, frame in expected if index >= cut]
+        assert deframer.feed(data[cut:]) == frames
+
+
+#----------------------------------------------------------------------
+def test_random_chunks_of_a_capture():
+    with open(RAW, 'rb') as file:
+        data = file.read()[:2**17]
+
+    rand = random.Random(0)
+    cuts = [rand.randrange(len(data)) for _ in range(200)]
+    cuts += [i + 1 for i, byte in enumerate(data[:-1]) if byte == CONST.CTRLCHAR][:20]
+
+    compare(data, split(data, cuts))
+
+    expected = legacy(data)
+    for cut in cuts[:20]:
+        deframer = Deframer()
+        deframer.skip(data[:cut])
+        assert deframer.feed(data[cut:]) == [frame for index, frame in expected if index >= cut]
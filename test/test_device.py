@@ -0,0 +1,38 @@
+import time
+
+from pycollect import database
+from pycollect.device import GEDevice, FakeDevice
+
+RAW = sorted(database.RAWS_ABSPATH)[2]
+
+
+#----------------------------------------------------------------------
+def test_fast_replay_reads_the_requested_size():
+    device = GEDevice(RAW, pacing='fast', loop=False)
+
+    sizes = []
+    read = device.device.read
+
+    def counted(size):
+        data = read(size)
+        sizes.append(len(data))
+        return data
+
+    device.device.read = counted
+
+    device.READING = True
+    device.read(size=2**14)
+
+    with open(RAW, 'rb') as file:
+        assert bytes(device.BUFFER) == file.read()
+
+    assert max(sizes) == 2**14
+
+
+#----------------------------------------------------------------------
+def test_realtime_clock_starts_with_the_first_read():
+    device = FakeDevice(RAW, pacing='realtime', speed=100, loop=False)
+    time.sleep(0.2)
+
+    # The setup time is not replayed as a burst
+    assert len(device.read(2**20)) == 0
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+import pyedflib
+
+from pycollect.edfwriter import EDF, EDFChannel
+
+RATES = {'ECG': 8, 'PLETH': 4}
+
+
+#----------------------------------------------------------------------
+def stream(filename, **kwargs):
+    """EDF+ file opened for streaming digital samples."""
+
+    edf = EDF(filename)
+    edf.set_header()
+
+    for label, rate in RATES.items():
+        edf.add_channel(EDFChannel(None, label=label, dimension='mV', sample_rate=rate,
+                                   physical_max=327.67, physical_min=-327.68,
+                                   digital_max=2**15 - 1, digital_min=-2**15))
+
+    edf.open(digital=True, **kwargs)
+    return edf
+
+
+#----------------------------------------------------------------------
+@pytest.fixture
+def filename(tmp_path):
+    """Filename for a new EDF+, skip if the installed `pyedflib` does not
+    accept the `sample_rate` and `gender` headers."""
+
+    filename = str(tmp_path / 'waves.edf')
+
+    try:
+        stream(filename).close()
+    except (KeyError, FutureWarning) as error:
+        pytest.skip('pyedflib {} is not supported: {}'.format(pyedflib.__version__, error))
+
+    return filename
+
+
+#----------------------------------------------------------------------
+def read(filename):
+    """Digital samples of each channel."""
+
+    reader = pyedflib.EdfReader(filename)
+    try:
+        return {label: reader.readSignal(i, digital=True) for i, label in enumerate(reader.getSignalLabels())}
+    finally:
+        reader.close()
+
+
+#----------------------------------------------------------------------
+def test_digital_streaming_round_trip(filename):
+    rand = np.random.RandomState(0)
+    samples = {label: rand.randint(-2**15, 2**15, size=10 * rate).astype(np.int16) for label, rate in RATES.items()}
+    samples['ECG'][:2] = [-2**15, 2**15 - 1]
+
+    edf = stream(filename)
+
+    # Uneven and interleaved chunks, the records are written when both
+    # channels have data
+    positions = dict.fromkeys(RATES, 0)
+    while any(positions[label] < samples[label].size for label in RATES):
+        for label in RATES:
+            size = rand.randint(0, 2 * RATES[label])
+            edf.write(label, samples[label][positions[label]:positions[label] + size])
+            positions[label] += size
+
+    assert edf.records == 10
+    edf.close()
+
+    data = read(filename)
+    for label in RATES:
+        assert (data[label] == samples[label]).all()
+
+
+#----------------------------------------------------------------------
+def test_silent_channel_is_padded(filename):
+    edf = stream(filename, backlog=2)
+
+    edf.write('ECG', np.arange(5 * RATES['ECG']))
+    assert edf.records == 4
+    assert all(buffer.size < 2 * RATES[label] for buffer, label in zip(edf.buffers, RATES))
+
+    edf.close()
+
+    data = read(filename)
+    assert (data['ECG'] == np.arange(5 * RATES['ECG'])).all()
+    assert (data['PLETH'] == 0).all()
+    assert data['PLETH'].size == 5 * RATES['PLETH']
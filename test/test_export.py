@@ -0,0 +1,66 @@
+import gzip
+
+import numpy as np
+import pandas as pd
+
+from pycollect import GEDecode
+from pycollect.export import CSVExporter
+
+
+#----------------------------------------------------------------------
+def row(second, **values):
+    """Subrecord row for the store."""
+
+    values['datetime'] = np.datetime64(1533220221 + second, 's')
+    return values
+
+
+#----------------------------------------------------------------------
+def test_incremental_gzip_equals_to_csv(tmp_path):
+    decoder = GEDecode([])
+    exporter = CSVExporter(decoder, str(tmp_path / 'case'), compression='gzip', chunksize=3)
+
+    for second in range(5):
+        decoder.STORE_SUBRECORD.append(row(second, hr=60 + second, spo2=97.5))
+        decoder.STORE_WAVE.append('PLETH', 1533220221 + second, np.arange(10) + second, 1 / 100)
+    exporter.export()
+
+    for second in range(5, 9):
+        decoder.STORE_SUBRECORD.append(row(second, hr=60 + second, spo2=98.5))
+        decoder.STORE_WAVE.append('PLETH', 1533220221 + second, np.arange(10) - second, 1 / 100)
+    filenames = exporter.export()
+    exporter.close()
+
+    assert sorted(filenames) == sorted([str(tmp_path / 'case.csv.gz'), str(tmp_path / 'case.PLETH.csv.gz')])
+
+    with gzip.open(str(tmp_path / 'case.csv.gz'), 'rt', newline='') as file:
+        assert file.read() == decoder.DATA_SUBRECORD.to_csv()
+
+    with gzip.open(str(tmp_path / 'case.PLETH.csv.gz'), 'rt', newline='') as file:
+        assert file.read() == decoder.DATA_WAVE['PLETH'].to_csv()
+
+
+#----------------------------------------------------------------------
+def test_new_measure_starts_a_new_part(tmp_path):
+    decoder = GEDecode([])
+    exporter = CSVExporter(decoder, str(tmp_path / 'case'))
+
+    for second in range(3):
+        decoder.STORE_SUBRECORD.append(row(second, hr=60))
+    exporter.export()
+
+    # The measure appears in the second chunk
+    for second in range(3, 6):
+        decoder.STORE_SUBRECORD.append(row(second, hr=61, spo2=98))
+    filenames = exporter.export()
+    exporter.close()
+
+    assert str(tmp_path / 'case.part1.csv') in filenames
+
+    first = pd.read_csv(str(tmp_path / 'case.csv'), index_col=0)
+    second = pd.read_csv(str(tmp_path / 'case.part1.csv'), index_col=0)
+
+    assert list(first.columns) == ['datetime', 'hr']
+    assert list(second.columns) == ['datetime', 'hr', 'spo2']
+    assert list(second.index) == [3, 4, 5]
+    assert second['spo2'].tolist() == [98, 98, 98]
@@ -0,0 +1,33 @@
+import pytest
+
+from pycollect.headers import DatexHeaderResponse
+
+
+#----------------------------------------------------------------------
+def test_set_updates_values_and_raw():
+    header = DatexHeaderResponse(bytes(range(256)) * 6)
+    header.DATA
+
+    header.set('r_len', 1234)
+    header.set('r_time', [0x01, 0x02, 0x03, 0x04])
+    header.set('data', [0] * 1449 + [7])
+
+    assert header['r_len'] == 1234
+    assert header['r_len,'] == [0x04, 0xd2]
+    assert header['r_time'] == 0x01020304
+    assert header['-data,'][0] == 7
+
+    assert len(header.RAW) == header.LENGTH
+    assert header.RAW[:2] == (1234).to_bytes(2, 'little')
+    assert header.DATA['r_len'][1] == [0x04, 0xd2]
+
+    reloaded = DatexHeaderResponse(header.RAW)
+    assert reloaded.VALUES == header.VALUES
+
+
+#----------------------------------------------------------------------
+def test_set_unknown_element():
+    header = DatexHeaderResponse()
+
+    with pytest.raises(AssertionError):
+        header.set('unknown', 1)
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+
+from pycollect.session import SessionStore, SessionReader
+
+
+#----------------------------------------------------------------------
+def test_waveforms_after_reopen(tmp_path):
+    path = str(tmp_path / 'session')
+
+    session = SessionStore(path)
+    session.append_waveform('PLETH', 100, np.arange(5), 1 / 100)
+    session.append_waveform('ECG1', 100, [-32767, 1, 2], 1)
+    session.close()
+
+    # Continue the session, an incomplete sample at the end is discarded
+    with open(os.path.join(path, 'waves', '0000.i2'), 'ab') as file:
+        file.write(b'\x01')
+
+    session = SessionStore(path)
+    session.append_waveform('PLETH', 101, np.arange(5, 8), 1 / 100)
+    session.close()
+
+    reader = SessionReader(path)
+    assert reader.waveforms == ['PLETH', 'ECG1']
+    assert reader.samples('PLETH').tolist() == list(range(8))
+    assert reader.blocks('PLETH')['start'].tolist() == [0, 5]
+
+    wave = reader.waveform('PLETH')
+    assert np.allclose(wave['values'], np.arange(8) / 100)
+    assert wave['datetime'].iloc[-1].timestamp() == 101
+
+    ecg = reader.waveform('ECG1')['values'].tolist()
+    assert np.isnan(ecg[0]) and ecg[1:] == [1, 2]
+
+
+#----------------------------------------------------------------------
+def test_measures_keep_numbers_and_labels(tmp_path):
+    path = str(tmp_path / 'session')
+
+    session = SessionStore(path)
+    session.append_subrecord(100, {'hr': 60, 'bp': None, 'lbl': 'ART', })
+    session.append_subrecord(101, {'hr': 61.5, 'bp': 80, 'lbl': 'CVP', })
+    session.close()
+
+    # The kinds change after the reopen
+    session = SessionStore(path)
+    session.append_subrecord(102, {'hr': 'OFF', 'bp': 81, 'lbl': 'ART', 'new': 1, })
+    session.append_subrecord(103, {'hr': 62, 'lbl': None, })
+    session.close()
+
+    reader = SessionReader(path)
+    assert reader.times().tolist() == [100, 101, 102, 103]
+    assert reader.measures == ['hr', 'bp', 'lbl', 'new']
+
+    assert reader.measure('hr').tolist() == [60.0, 61.5, 'OFF', 62.0]
+    assert reader.measure('lbl').tolist() == ['ART', 'CVP', 'ART', None]
+    assert np.isnan(reader.measure('bp')).tolist() == [True, False, False, True]
+    assert np.isnan(reader.measure('new')).tolist() == [True, True, False, True]
+
+    subrecords = reader.subrecords()
+    assert len(subrecords) == 4
+    assert subrecords['hr'].tolist() == [60.0, 61.5, 'OFF', 62.0]
+
+
+#----------------------------------------------------------------------
+def test_incomplete_rows_are_discarded(tmp_path):
+    path = str(tmp_path / 'session')
+
+    session = SessionStore(path)
+    session.append_subrecord(100, {'hr': 60, })
+    session.append_subrecord(101, {'hr': 61, })
+    session.close()
+
+    # A crash after the value and before the time of the record
+    with open(os.path.join(path, 'display', '0000.f8'), 'ab') as file:
+        file.write(np.array([99.0]).tobytes())
+
+    session = SessionStore(path)
+    session.append_subrecord(102, {'hr': 62, })
+    session.close()
+
+    assert SessionReader(path).measure('hr').tolist() == [60, 61, 62]
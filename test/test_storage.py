@@ -0,0 +1,152 @@
+import numpy as np
+from pandas.testing import assert_frame_equal
+
+from pycollect.dataconstants import CONST
+from pycollect.storage import ChunkedArray, WaveformStore, WaveformView, SubrecordStore
+
+BLOCKS = [
+    (1000, [1, 2, 3], 1),
+    (1001, [4, CONST.DATA_INVALID, 6, 7], 1),
+    (1002, [8, 9], 1),
+]
+
+ROWS = [
+    {'datetime': 1, 'hr': 60},
+    {'datetime': 2, 'hr': 61, 'spo2': 98.5},
+    {'datetime': 3, 'spo2': 97.0, 'mode': 'AUTO'},
+    {'datetime': 4, 'hr': 62, 'mode': None},
+    {'datetime': 5, 'hr': 63, 'spo2': 96, 'mode': 'MANUAL'},
+]
+
+
+#----------------------------------------------------------------------
+def waveforms():
+    """Store with the same blocks appended one by one."""
+
+    store = WaveformStore()
+    for time_, samples, shift in BLOCKS:
+        store.append('ECG', time_, samples, shift=shift)
+    return store
+
+
+#----------------------------------------------------------------------
+def test_chunked_array_grows():
+    array = ChunkedArray(np.int64, capacity=1)
+
+    for i in range(10):
+        array.append(i)
+    array.extend(np.arange(10, 100))
+
+    assert len(array) == 100
+    assert array.data.size >= 100
+    assert (array.array() == np.arange(100)).all()
+    assert (array.array(10, 20) == np.arange(10, 20)).all()
+
+
+#----------------------------------------------------------------------
+def test_waveform_extend_equals_append():
+    store = WaveformStore()
+    samples = np.concatenate([samples for _, samples, _ in BLOCKS])
+    blocks = np.array([(time_, len(samples_), shift, True) for time_, samples_, shift in BLOCKS], dtype=WaveformStore.BLOCK_DTYPE)
+    store.extend('ECG', samples, blocks)
+
+    assert store.length('ECG') == 9
+    assert_frame_equal(store['ECG'], waveforms()['ECG'])
+
+
+#----------------------------------------------------------------------
+def test_waveform_dataframe():
+    store = waveforms()
+    dataframe = store['ECG']
+
+    assert np.isnan(dataframe['values'][4])
+    assert dataframe['values'].dropna().tolist() == [1, 2, 3, 4, 6, 7, 8, 9]
+    assert (dataframe['datetime'].astype('int64') // 10**9).tolist() == [1000] * 3 + [1001] * 4 + [1002] * 2
+    assert store.status('ECG').tolist() == [0] * 4 + [CONST.DATA_INVALID] + [0] * 4
+
+    for start in range(store.length('ECG') + 1):
+        # The values keep an integer type after the last special value
+        expected = dataframe.iloc[start:].reset_index(drop=True)
+        assert_frame_equal(store.dataframe('ECG', start), expected, check_dtype=False)
+
+
+#----------------------------------------------------------------------
+def test_waveform_dataframe_is_a_copy():
+    store = waveforms()
+
+    store['ECG']['values'] = 0
+    assert store['ECG']['values'][0] == 1
+
+    store.append('ECG', 1003, [10])
+    assert store['ECG']['values'].tolist()[-1] == 10
+
+
+#----------------------------------------------------------------------
+def test_waveform_view():
+    store = waveforms()
+    view = WaveformView(store)
+
+    assert list(view) == ['ECG']
+
+    view.reset()
+    assert not 'ECG' in view
+    assert len(view) == 0
+
+    store.append('ECG', 1003, [10, 11])
+    store.append('PLETH', 1003, [5])
+
+    assert view['ECG']['values'].tolist() == [10, 11]
+    assert view['PLETH']['values'].tolist() == [5]
+
+
+#----------------------------------------------------------------------
+def test_subrecord_extend_equals_append():
+    appended = SubrecordStore()
+    for row in ROWS:
+        appended.append(row)
+
+    labels = ['hr', 'spo2', 'mode']
+    columns = {}
+    for label in labels:
+        present = [label in row for row in ROWS]
+        values = [row[label] for row in ROWS if label in row]
+        columns[label] = (values, present)
+
+    extended = SubrecordStore()
+    extended.extend([row['datetime'] for row in ROWS], columns)
+
+    assert len(extended) == len(appended) == len(ROWS)
+    assert_frame_equal(extended.dataframe(), appended.dataframe())
+
+
+#----------------------------------------------------------------------
+def test_subrecord_dataframe():
+    store = SubrecordStore()
+    for row in ROWS:
+        store.append(row)
+
+    dataframe = store.dataframe()
+
+    assert list(dataframe.columns) == ['datetime', 'hr', 'mode', 'spo2']
+    assert np.isnan(dataframe['hr'][2])
+    assert dataframe['spo2'].tolist()[1:3] == [98.5, 97.0]
+    assert dataframe['spo2'].tolist()[4] == 96
+    assert dataframe['mode'].tolist()[2:] == ['AUTO', None, 'MANUAL']
+
+    for start in range(len(ROWS) - 1):
+        expected = dataframe.iloc[start:].reset_index(drop=True)
+        assert_frame_equal(store.dataframe(start), expected)
+
+    assert store.dataframe(len(ROWS)).empty
+
+
+#----------------------------------------------------------------------
+def test_subrecord_dataframe_is_a_copy():
+    store = SubrecordStore()
+    store.append(ROWS[0])
+
+    store.dataframe()['hr'] = 0
+    assert store.dataframe()['hr'][0] == 60
+
+    store.append(ROWS[1])
+    assert store.dataframe()['hr'].tolist() == [60, 61]